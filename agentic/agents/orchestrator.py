@@ -1,46 +1,100 @@
-from typing import Dict, Any, List
+import json
+import re
+import time
+from typing import Dict, Any, List, Optional, Tuple
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langgraph.graph import StateGraph, END
 from langgraph.graph.message import add_messages
 from typing_extensions import Annotated, TypedDict
-import json
+from agentic.agents.planner import QueryPlanner
 from agentic.tools.semantic_search import SemanticSearchTool
 from agentic.tools.structured_filter import StructuredFilterTool
-from agentic.system_message import SYSTEM_MESSAGE
+from agentic.prompts.templates import RESPONSE_TEMPLATE, SHORT_RESPONSE_TEMPLATE
 from agentic.factory.llm import LLMModel
-from agentic.utils.analyze import AnalyzeResponse
+from agentic.utils.deadline import Deadline, DeadlineExceeded, run_with_deadline
+from agentic.utils.conversation_cache import NOTHING_TO_CONTINUE, CandidateSet, ConversationCache, FollowUp, parse_follow_up
+from agentic.utils.filter_parser import FilterParser
 from agentic.utils.get_env import get_env
+from agentic.utils.metrics import ROUTE_STRATEGY, SERVED_BY, STAGE_TIMEOUTS, SEARCH_RESULT_TOKENS
+from agentic.utils.tracing import trace, span, record_llm_usage
+from agentic.utils.listing_renderer import ListingRenderer
+from agentic.utils.query_cache import QueryCache, normalize_query, uncounted
+from agentic.utils.query_log import QueryLog
+from agentic.utils.reranker import MMRReranker
+from agentic.utils.result_serializer import ResultSerializer
 
 class AgentState(TypedDict):
     messages: Annotated[list, add_messages]
     user_query: str
+    search_strategy: str
+    filters: Dict[str, Any]
+    listing: bool
+    products: List[Dict[str, Any]]
+    candidates: List[Dict[str, Any]]
+    results_header: str
     search_results: str
+    search_tokens: int
     final_response: str
-    thinks: List[str]
+    served_by: str
+    deadline: Deadline
+    timeouts: List[str]
+
+LISTING_PATTERN = re.compile(r"^\s*(show|list|find|give|get)\b", re.IGNORECASE)
 
 
 class OrchestratorAgent:
-    def __init__(self):
-        llm_provider = LLMModel()
-        self.llm = llm_provider.get()
-        self.semantic_search = SemanticSearchTool()
-        self.structured_filter = StructuredFilterTool()
+    def __init__(self, llm=None, planner: QueryPlanner = None, semantic_search: SemanticSearchTool = None, structured_filter: StructuredFilterTool = None, query_log: QueryLog = None):
+        # Components can be injected (e.g. fake backends in bench/); defaults talk to Ollama and Postgres
+        self.llm = llm or LLMModel().get()
+        self.planner = planner or QueryPlanner()
+        self.semantic_search = semantic_search or SemanticSearchTool()
+        self.structured_filter = structured_filter or StructuredFilterTool()
+        self.query_log = query_log or QueryLog()
+        # Search results by strategy, query and filters; short TTL so price and stock changes show up
+        self.result_cache = QueryCache(
+            "search_results",
+            int(get_env("RESULT_CACHE_SIZE", "512")),
+            float(get_env("RESULT_CACHE_TTL_SECONDS", "300"))
+        )
+        # Semantic search over-fetches this many candidates for the MMR re-ranker to pick SEARCH_TOP_K from
+        self.rerank_candidates = int(get_env("RERANK_CANDIDATES", "20"))
+        self.reranker = MMRReranker()
+        # Ranked candidates per conversation, so follow-ups page through them instead of searching again
+        self.conversations = ConversationCache()
+        self.serializer = ResultSerializer()
+        self.short_serializer = ResultSerializer(token_budget=250, description_tokens=15)
+        self.renderer = ListingRenderer()
+        self.filter_parser = FilterParser()
+        self.fast_answers = get_env("FAST_ANSWERS", "true").lower() == "true"
+        self.request_deadline = float(get_env("REQUEST_DEADLINE_SECONDS", "30"))
+        self.llm_deadline = float(get_env("LLM_DEADLINE_SECONDS", "20"))
+        # Below this much remaining time, generation switches to the short prompt
+        self.short_prompt_threshold = float(get_env("SHORT_PROMPT_THRESHOLD_SECONDS", "8"))
+        self.min_generation_seconds = float(get_env("MIN_GENERATION_SECONDS", "1"))
         self.graph = self._build_graph()
 
+    def _traced(self, name: str, node):
+        """Wrap a graph node in a latency span"""
+        def run(state: AgentState) -> AgentState:
+            with span(f"node.{name}"):
+                return node(state)
+        return run
+
     def _build_graph(self):
         """Build the LangGraph workflow"""
         workflow = StateGraph(AgentState)
 
         # Add nodes
-        workflow.add_node("analyze_query", self._analyze_query)
-        workflow.add_node("semantic_search", self._semantic_search)
-        workflow.add_node("structured_filter", self._structured_filter)
-        workflow.add_node("generate_response", self._generate_response)
+        workflow.add_node("plan_query", self._traced("plan_query", self._plan_query))
+        workflow.add_node("semantic_search", self._traced("semantic_search", self._semantic_search))
+        workflow.add_node("structured_filter", self._traced("structured_filter", self._structured_filter))
+        workflow.add_node("rerank", self._traced("rerank", self._rerank))
+        workflow.add_node("generate_response", self._traced("generate_response", self._generate_response))
 
         # Add edges
-        workflow.set_entry_point("analyze_query")
+        workflow.set_entry_point("plan_query")
         workflow.add_conditional_edges(
-            "analyze_query",
+            "plan_query",
             self._route_query,
             {
                 "semantic": "semantic_search",
@@ -48,106 +102,347 @@ class OrchestratorAgent:
                 "both": "semantic_search"
             }
         )
-        workflow.add_edge("semantic_search", "generate_response")
-        workflow.add_edge("structured_filter", "generate_response")
+        workflow.add_edge("semantic_search", "rerank")
+        workflow.add_edge("structured_filter", "rerank")
+        workflow.add_edge("rerank", "generate_response")
         workflow.add_edge("generate_response", END)
 
         return workflow.compile()
 
-    def _analyze_query(self, state: AgentState) -> AgentState:
-        """Analyze the user query to determine search strategy"""
-        query = state["user_query"]
+    def load_vocabulary(self):
+        """Load brand/category names for the rule-based filter parser"""
+        vocabulary = self.structured_filter.vocabulary()
+        self.filter_parser.load_vocabulary(vocabulary["brands"], vocabulary["categories"])
 
-        analysis_prompt = f"""
-        Analyze this user query and determine the best search approach:
-        Query: "{query}"
-        
-        Choose one:
-        - "semantic" for natural language descriptions (e.g., "comfortable shoes for running")
-        - "structured" for specific filters (e.g., "Nike shoes under $100")
-        - "both" for mixed queries
-        
-        Make sure respond with just the strategy name.
-        """
+    def is_cheap(self, user_query: str, conversation_id: Optional[str] = None) -> bool:
+        """Guess, without calling a model, whether the query will be answered by the templated listing"""
+        return self.fast_answers and (
+            (bool(LISTING_PATTERN.match(user_query)) and bool(self.filter_parser.parse(user_query)))
+            or self.follow_up(user_query, conversation_id) is not None
+        )
+
+    def follow_up(self, user_query: str, conversation_id: Optional[str]) -> Optional[Tuple[Optional[CandidateSet], FollowUp]]:
+        """The follow-up the message asks and the conversation's candidate set, None if there is no set to follow up on"""
+        candidates = self.conversations.get(conversation_id) if conversation_id else None
+        # Any known brand may be excluded; one the set doesn't hold leaves it unchanged
+        brands = self.filter_parser.brands + (candidates.brands() if candidates is not None else [])
+        follow_up = parse_follow_up(user_query, brands)
+        if follow_up is None:
+            return None
+        # A message naming a price, category or another brand is a new search
+        filters = self.filter_parser.parse(user_query)
+        excluded = {brand.lower() for brand in follow_up.exclude}
+        if set(filters) - {"brand"} or (filters.get("brand") and filters["brand"].lower() not in excluded):
+            return None
+        return candidates, follow_up
+
+    def _timed_out(self, state: AgentState, err: DeadlineExceeded) -> AgentState:
+        print(f"Timeout: {err}")
+        state["timeouts"] = state.get("timeouts", []) + [err.stage]
+        return state
 
-        response = self.llm.invoke(analysis_prompt)
-        content = response.content.strip().lower()
-        
-        model = get_env("AGENT_MODEL")
-        analyzed_response = AnalyzeResponse(content)
-        analyzed_response.refine(model)
-        
-        state["search_strategy"] = analyzed_response.message
-        state["thinks"] = state.get("thinks", []) + [analyzed_response.reasoning]
+    def _plan_query(self, state: AgentState) -> AgentState:
+        """Decide the search strategy and extract structured filters in one LLM call"""
+        try:
+            plan = self.planner.plan(state["user_query"], state.get("deadline"))
+        except DeadlineExceeded as err:
+            # Route to semantic search, restricted by whatever filters the parser can find
+            self._timed_out(state, err)
+            filters = self.filter_parser.parse(state["user_query"])
+            state["search_strategy"] = "both" if filters else "semantic"
+            state["filters"] = filters
+            state["listing"] = False
+            return state
 
+        state["search_strategy"] = plan.strategy
+        state["filters"] = plan.filter_args()
+        state["listing"] = plan.listing
         return state
 
     def _route_query(self, state: AgentState) -> str:
         """Route to appropriate search method"""
         return state.get("search_strategy", "semantic")
 
+    def _set_results(self, state: AgentState, products: List[Dict[str, Any]], header: str = None) -> AgentState:
+        """Store raw products and their token-budgeted serialization in the state"""
+        state["products"] = products
+        if not products:
+            state["search_results"] = "No products found matching your query."
+            state["search_tokens"] = 0
+            return state
+
+        serialized = self.serializer.serialize(products, state["user_query"], header=header)
+        state["search_results"] = serialized.text
+        state["search_tokens"] = serialized.token_count
+        return state
+
+    def _cached(self, key: str, search, prewarm: bool = False) -> List[Dict[str, Any]]:
+        """Serve a search from the result cache, or run it and cache non-empty results"""
+        if not prewarm:
+            cached = self.result_cache.get(key)
+            if cached is not None:
+                return [dict(product) for product in cached]
+        products = search()
+        if products:
+            self.result_cache.put(key, [dict(product) for product in products], prewarmed=prewarm)
+        return products
+
+    def _search_semantic(self, query: str, filters: Optional[Dict[str, Any]], deadline: Optional[Deadline] = None, prewarm: bool = False) -> List[Dict[str, Any]]:
+        """Semantic candidates, over-fetched with their pairwise similarities when re-ranking is enabled"""
+        key = f"semantic|{query}|{json.dumps(filters or {}, sort_keys=True)}"
+        rerank = self.rerank_candidates > self.semantic_search.top_k
+        return self._cached(key, lambda: self.semantic_search.search_products(
+            query,
+            top_k=self.rerank_candidates if rerank else None,
+            filters=filters,
+            deadline=deadline,
+            pairwise=rerank
+        ), prewarm)
+
+    def _search_structured(self, filters: Dict[str, Any], deadline: Optional[Deadline] = None, prewarm: bool = False) -> List[Dict[str, Any]]:
+        key = f"structured|{json.dumps(filters, sort_keys=True)}"
+        return self._cached(key, lambda: self.structured_filter.filter_products(**filters, deadline=deadline), prewarm)
+
+    def prewarm(self, entries: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Precompute embeddings and search results for popular queries ({query, strategy, filters})"""
+        counts = {"queries": 0, "embeddings": 0, "results": 0}
+        for entry in entries:
+            query, strategy, filters = entry["query"], entry.get("strategy") or "semantic", entry.get("filters") or {}
+            if strategy == "follow_up":
+                # "show me more" means nothing without its conversation
+                continue
+            try:
+                # The searches below read the entries just written; those are not hits
+                with uncounted():
+                    if strategy == "structured" and filters:
+                        products = self._search_structured(filters, prewarm=True)
+                    else:
+                        counts["embeddings"] += self.semantic_search.warm_embeddings([query])
+                        products = self._search_semantic(query, filters if strategy == "both" else None, prewarm=True)
+            except Exception as e:
+                print(f"Failed to pre-warm {query!r}: {e}")
+                continue
+            counts["queries"] += 1
+            counts["results"] += bool(products)
+        return counts
+
     def _semantic_search(self, state: AgentState) -> AgentState:
         """Perform semantic search"""
         query = state["user_query"]
-        results = self.semantic_search(query)
-        state["search_results"] = results
+        # Hybrid queries search semantically within the planned filters
+        filters = state.get("filters") if state.get("search_strategy") == "both" else None
+        try:
+            products = self._search_semantic(query, filters, state.get("deadline"))
+        except DeadlineExceeded as err:
+            self._timed_out(state, err)
+            products = []
+        state["products"] = products
         return state
 
     def _structured_filter(self, state: AgentState) -> AgentState:
         """Perform structured filtering"""
         query = state["user_query"]
 
-        # Extract filters from query using LLM
-        filter_prompt = f"""
-        Extract structured filters from this query: "{query}"
-        
-        Return a JSON object with these possible keys (only include if mentioned):
-        - brand: string
-        - category: string
-        - min_price: number
-        - max_price: number
-        - name_contains: string
-        
-        Example: {{"brand": "Nike", "max_price": 100}}
-        """
-
-        response = self.llm.invoke(filter_prompt)
+        filters = state.get("filters") or self.filter_parser.parse(query)
+        # Kept for the query log and for fetching further pages of the same listing
+        state["filters"] = filters
+        deadline = state.get("deadline")
         try:
-            filters = json.loads(response.content)
-            results = self.structured_filter(filters)
-        except:
-            # Fallback to semantic search if parsing fails
-            results = self.semantic_search(query)
+            if filters:
+                products = self._search_structured(filters, deadline)
+                header = f"Found {len(products)} products matching your criteria:"
+            else:
+                # Fallback to semantic search if neither the plan nor the parser found filters
+                products = self._search_semantic(query, None, deadline)
+                header = None
+        except DeadlineExceeded as err:
+            self._timed_out(state, err)
+            products, header = [], None
 
-        state["search_results"] = results
+        state["products"] = products
+        state["results_header"] = header
+        return state
+
+    def _rerank(self, state: AgentState) -> AgentState:
+        """Diversify semantic candidates with MMR and show the first SEARCH_TOP_K; structured results keep their order"""
+        products = state.get("products") or []
+        candidates = products
+        top_k = self.semantic_search.top_k
+        if any(product.get("similarity_score") is not None for product in products):
+            with span("rerank"):
+                # The whole ranking is kept for follow-up pages; its first top_k are the MMR picks
+                candidates = self.reranker.rank(products) if len(products) > top_k else self.reranker.rerank(products, top_k)
+            products = candidates[:top_k]
+        state["candidates"] = candidates
+        return self._set_results(state, products, header=state.get("results_header"))
+
+    def _render_listing(self, state: AgentState) -> AgentState:
+        state["final_response"] = self.renderer.render(state["user_query"], state.get("products") or [])
+        state["served_by"] = "template"
         return state
 
     def _generate_response(self, state: AgentState) -> AgentState:
-        """Generate final response to user"""
+        """Generate final response to user, degrading to shorter prompts as the deadline nears"""
+        if self.fast_answers and state.get("listing"):
+            return self._render_listing(state)
+
         query = state["user_query"]
-        search_results = state["search_results"]
-
-        response_prompt = f"""
-        {SYSTEM_MESSAGE}
-        
-        User Query: "{query}"
-        Search Results: {search_results}
-        
-        Based on the search results, provide a response following your role as ProductFinder.
-        """
+        deadline = state.get("deadline")
+        remaining = deadline.remaining() if deadline else self.llm_deadline
+
+        if remaining < self.min_generation_seconds:
+            return self._render_listing(self._timed_out(state, DeadlineExceeded("generate_response")))
+
+        if remaining < self.short_prompt_threshold:
+            products = state.get("products") or []
+            search_results = self.short_serializer.serialize(products, query).text if products else state["search_results"]
+            messages = SHORT_RESPONSE_TEMPLATE.build(query=query, search_results=search_results)
+        else:
+            messages = RESPONSE_TEMPLATE.build(query=query, search_results=state["search_results"])
+
+        try:
+            with span("llm.generate_response"):
+                response = run_with_deadline(
+                    self.llm.invoke, deadline, "generate_response", messages,
+                    stage_budget=self.llm_deadline
+                )
+        except DeadlineExceeded as err:
+            return self._render_listing(self._timed_out(state, err))
+        record_llm_usage("generate_response", response)
 
-        response = self.llm.invoke(response_prompt)
         state["final_response"] = response.content
+        state["served_by"] = "llm"
         return state
 
-    def chat(self, user_query: str) -> str:
-        """Main chat interface"""
-        initial_state = {
+    def _initial_state(self, user_query: str, deadline: Deadline) -> AgentState:
+        return {
             "messages": [],
             "user_query": user_query,
+            "filters": {},
+            "listing": False,
+            "products": [],
+            "candidates": [],
+            "results_header": None,
             "search_results": "",
-            "final_response": ""
+            "search_tokens": 0,
+            "final_response": "",
+            "served_by": "",
+            "deadline": deadline,
+            "timeouts": []
         }
 
-        final_state = self.graph.invoke(initial_state)
-        return final_state["final_response"]
+    def _more_matches(self, candidates: CandidateSet, follow_up: FollowUp, deadline: Deadline) -> List[Dict[str, Any]]:
+        """Run the set's original search again for more matches than it holds, within the follow-up's price bounds"""
+        limit = len(candidates.products) + self.rerank_candidates
+        filters = candidates.search_filters(follow_up)
+        if candidates.strategy == "structured" and candidates.filters:
+            return self.structured_filter.filter_products(**filters, limit=limit, deadline=deadline)
+        if candidates.strategy != "both":
+            # Semantic sets only take the price bounds
+            filters = {key: value for key, value in filters.items() if key in ("min_price", "max_price")}
+        return self.semantic_search.search_products(candidates.query, top_k=limit, filters=filters or None, deadline=deadline)
+
+    def _serve_follow_up(self, conversation_id: str, candidates: CandidateSet, follow_up: FollowUp, user_query: str, deadline: Deadline) -> AgentState:
+        """Answer from the conversation's candidate set, fetching more matches for its original search once it runs out"""
+        state = self._initial_state(f"{candidates.query} ({user_query})", deadline)
+        state["search_strategy"] = "follow_up"
+        state["filters"] = candidates.filters
+        state["listing"] = True
+        with span("conversation_cache"):
+            page = candidates.next_page(follow_up, self.semantic_search.top_k)
+        if not page:
+            try:
+                with span("conversation_cache.more_matches"):
+                    added = candidates.extend(self._more_matches(candidates, follow_up, deadline))
+            except DeadlineExceeded as err:
+                self._timed_out(state, err)
+                added = 0
+            if added:
+                page = candidates.next_page(follow_up, self.semantic_search.top_k)
+                # Re-store so the cache accounts for the larger set
+                self.conversations.put(conversation_id, candidates)
+        if not page:
+            # Nothing further matches; say so rather than searching for the follow-up's words
+            state = self._render_listing(self._set_results(state, []))
+        else:
+            state = self._generate_response(self._set_results(state, page))
+        if state["served_by"] == "template":
+            state["served_by"] = "conversation_cache"
+        return state
+
+    def _nothing_to_continue(self, user_query: str, deadline: Deadline) -> AgentState:
+        """Answer a follow-up that has no earlier listing, instead of searching for its words"""
+        state = self._initial_state(user_query, deadline)
+        state["search_strategy"] = "follow_up"
+        state["final_response"] = NOTHING_TO_CONTINUE
+        state["served_by"] = "conversation_cache"
+        return state
+
+    def new_deadline(self, seconds: Optional[float] = None) -> Deadline:
+        """A request deadline of the given seconds, never longer than REQUEST_DEADLINE_SECONDS"""
+        return Deadline(min(seconds, self.request_deadline) if seconds else self.request_deadline)
+
+    def chat(
+        self,
+        user_query: str,
+        deadline_seconds: Optional[float] = None,
+        conversation_id: Optional[str] = None,
+        deadline: Optional[Deadline] = None
+    ) -> Dict[str, Any]:
+        """Main chat interface, returns the response, the path that served it, stage timeouts and timings
+
+        Pass `deadline` to count time spent before the call (e.g. queueing) against the request.
+        """
+        deadline = deadline or self.new_deadline(deadline_seconds)
+
+        with trace() as current:
+            final_state = None
+            candidates = None
+            match = self.follow_up(user_query, conversation_id)
+            if match is not None:
+                candidates, follow_up = match
+                if candidates is None:
+                    # e.g. "show me more" after a search that found nothing, or once the set expired
+                    final_state = self._nothing_to_continue(user_query, deadline)
+                else:
+                    final_state = self._serve_follow_up(conversation_id, candidates, follow_up, user_query, deadline)
+            if conversation_id:
+                self.conversations.record(candidates is not None)
+            if final_state is None:
+                final_state = self.graph.invoke(self._initial_state(user_query, deadline))
+                if conversation_id:
+                    # A new question replaces the conversation's candidates, even with none
+                    self.conversations.discard(conversation_id)
+                    if final_state.get("candidates"):
+                        self.conversations.put(conversation_id, CandidateSet(
+                            user_query,
+                            final_state.get("search_strategy"),
+                            final_state.get("filters") or {},
+                            final_state["candidates"],
+                            shown=len(final_state.get("products") or [])
+                        ))
+
+        ROUTE_STRATEGY.labels(final_state.get("search_strategy") or "unknown").inc()
+        SERVED_BY.labels(final_state["served_by"]).inc()
+        SEARCH_RESULT_TOKENS.observe(final_state["search_tokens"])
+        for stage in final_state["timeouts"]:
+            STAGE_TIMEOUTS.labels(stage).inc()
+
+        timings = current.breakdown()
+        self.query_log.record({
+            "ts": time.time(),
+            "query": normalize_query(user_query),
+            "strategy": final_state.get("search_strategy"),
+            "filters": final_state.get("filters") or {},
+            "result_ids": [product.get("id") for product in final_state.get("products") or []],
+            "served_by": final_state["served_by"],
+            "latency_ms": timings["total_ms"],
+            "timeouts": final_state["timeouts"],
+        })
+
+        return {
+            "response": final_state["final_response"],
+            "served_by": final_state["served_by"],
+            "timeouts": final_state["timeouts"],
+            "timings": timings
+        }
@@ -0,0 +1,53 @@
+"""
+Query planner: routing strategy and structured filters in a single LLM call
+"""
+from typing import Dict, Any, Literal, Optional
+from pydantic import BaseModel, ValidationError
+from agentic.factory.llm import LLMModel
+from agentic.prompts.templates import PLAN_TEMPLATE
+from agentic.utils.deadline import Deadline, run_with_deadline
+from agentic.utils.get_env import get_env
+from agentic.utils.tracing import span, record_llm_usage
+
+
+class SearchFilters(BaseModel):
+    brand: Optional[str] = None
+    category: Optional[str] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    name_contains: Optional[str] = None
+
+
+class QueryPlan(BaseModel):
+    strategy: Literal["semantic", "structured", "both"] = "semantic"
+    filters: SearchFilters = SearchFilters()
+    listing: bool = False
+
+    def filter_args(self) -> Dict[str, Any]:
+        """Filters that were actually extracted, ready for filter_products(**args)"""
+        return self.filters.model_dump(exclude_none=True)
+
+
+class QueryPlanner:
+    def __init__(self, llm=None):
+        # Schema-constrained JSON output, no thinking tokens: this call only routes
+        self.llm = llm or LLMModel().get(
+            format=QueryPlan.model_json_schema(),
+            reasoning=False,
+            temperature=0,
+        )
+        self.timeout = float(get_env("PLAN_TIMEOUT_SECONDS", "5"))
+
+    def plan(self, query: str, deadline: Optional[Deadline] = None) -> QueryPlan:
+        """Ask the LLM for a plan; fall back to plain semantic search on malformed output"""
+        with span("llm.plan"):
+            response = run_with_deadline(
+                self.llm.invoke, deadline, "plan", PLAN_TEMPLATE.build(query=query),
+                stage_budget=self.timeout
+            )
+        record_llm_usage("plan", response)
+        try:
+            return QueryPlan.model_validate_json(response.content)
+        except ValidationError as err:
+            print(f"Invalid query plan, falling back to semantic search: {err}")
+            return QueryPlan()
@@ -0,0 +1,209 @@
+"""
+Admission control for LLM-bound requests
+
+A local model only serves a few generations at a time, so each model gets a
+bounded number of concurrent requests. Excess requests wait in a bounded queue
+that is served round-robin across users, with a priority lane for cheap
+requests (templated or cached answers) that has its own queue bound, so a
+backlog of expensive requests never locks out cheap ones. When a queue is full,
+requests are rejected immediately with a Retry-After hint instead of piling up.
+"""
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Optional
+from agentic.utils.get_env import get_env
+from agentic.utils.metrics import ADMISSION_QUEUE_DEPTH, ADMISSION_RUNNING, ADMISSION_WAIT_SECONDS, ADMISSION_REJECTED
+
+CHEAP = 0
+NORMAL = 1
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        model: str,
+        max_concurrency: int = None,
+        max_queue: int = None,
+        max_queue_per_user: int = None,
+        max_wait_seconds: float = None
+    ):
+        self.model = model
+        self.max_concurrency = max_concurrency or int(get_env("LLM_MAX_CONCURRENCY", "2"))
+        self.max_queue = max_queue or int(get_env("ADMISSION_QUEUE_SIZE", "32"))
+        self.max_queue_per_user = max_queue_per_user or int(get_env("ADMISSION_QUEUE_PER_USER", "4"))
+        self.max_wait_seconds = max_wait_seconds or float(get_env("ADMISSION_MAX_WAIT_SECONDS", "10"))
+
+        self.running = 0
+        # priority -> user_id -> waiting futures; OrderedDict order is the round-robin order
+        self.waiting: Dict[int, "OrderedDict[str, Deque[asyncio.Future]]"] = {CHEAP: OrderedDict(), NORMAL: OrderedDict()}
+        self.queued = 0
+        self.queued_by_priority = {CHEAP: 0, NORMAL: 0}
+        self.queued_per_user: Dict[str, int] = {}
+
+        self.service_seconds = 5.0  # moving average, seeds the Retry-After estimate
+        self.counters = {"admitted": 0, "admitted_cheap": 0, "rejected_queue_full": 0, "rejected_user_limit": 0, "rejected_wait_timeout": 0}
+        self.wait_count = 0
+        self.wait_sum = 0.0
+        self.wait_max = 0.0
+        self.recent_waits: Deque[float] = deque(maxlen=1000)
+
+    def _retry_after(self) -> int:
+        return max(1, math.ceil(self.service_seconds * (self.queued + 1) / self.max_concurrency))
+
+    def _update_gauges(self):
+        ADMISSION_QUEUE_DEPTH.labels(self.model, "cheap").set(self.queued_by_priority[CHEAP])
+        ADMISSION_QUEUE_DEPTH.labels(self.model, "normal").set(self.queued_by_priority[NORMAL])
+        ADMISSION_RUNNING.labels(self.model).set(self.running)
+
+    def _reject(self, reason: str, status_code: int, detail: str) -> AdmissionRejected:
+        self.counters[f"rejected_{reason}"] += 1
+        ADMISSION_REJECTED.labels(self.model, reason).inc()
+        return AdmissionRejected(status_code, detail, self._retry_after())
+
+    def _record_wait(self, seconds: float):
+        ADMISSION_WAIT_SECONDS.labels(self.model).observe(seconds)
+        self.wait_count += 1
+        self.wait_sum += seconds
+        self.wait_max = max(self.wait_max, seconds)
+        self.recent_waits.append(seconds)
+
+    def _enqueue(self, user_id: str, priority: int) -> asyncio.Future:
+        if self.queued_by_priority[priority] >= self.max_queue:
+            raise self._reject("queue_full", 503, "Server busy, queue is full")
+        if self.queued_per_user.get(user_id, 0) >= self.max_queue_per_user:
+            raise self._reject("user_limit", 429, "Too many pending requests for this user")
+
+        future = asyncio.get_running_loop().create_future()
+        self.waiting[priority].setdefault(user_id, deque()).append(future)
+        self.queued += 1
+        self.queued_by_priority[priority] += 1
+        self.queued_per_user[user_id] = self.queued_per_user.get(user_id, 0) + 1
+        self._update_gauges()
+        return future
+
+    def _remove(self, user_id: str, priority: int, future: asyncio.Future):
+        lane = self.waiting[priority]
+        waiters = lane.get(user_id)
+        if waiters is None or future not in waiters:
+            return
+        waiters.remove(future)
+        if not waiters:
+            del lane[user_id]
+        self._dequeued(user_id, priority)
+
+    def _dequeued(self, user_id: str, priority: int):
+        self.queued -= 1
+        self.queued_by_priority[priority] -= 1
+        self.queued_per_user[user_id] -= 1
+        if not self.queued_per_user[user_id]:
+            del self.queued_per_user[user_id]
+
+    def _dispatch(self):
+        """Hand free slots to waiters: cheap lane first, round-robin across users"""
+        while self.running < self.max_concurrency and self.queued:
+            for priority in (CHEAP, NORMAL):
+                lane = self.waiting[priority]
+                if lane:
+                    user_id, waiters = next(iter(lane.items()))
+                    future = waiters.popleft()
+                    if waiters:
+                        lane.move_to_end(user_id)
+                    else:
+                        del lane[user_id]
+                    self._dequeued(user_id, priority)
+                    break
+            else:
+                break
+            if future.done():
+                continue
+            self.running += 1
+            future.set_result(True)
+        self._update_gauges()
+
+    async def acquire(self, user_id: str, cheap: bool = False, max_wait: Optional[float] = None):
+        started = time.monotonic()
+        wait_seconds = self.max_wait_seconds if max_wait is None else min(self.max_wait_seconds, max_wait)
+        priority = CHEAP if cheap else NORMAL
+
+        if self.running < self.max_concurrency and not self.queued:
+            self.running += 1
+            self._update_gauges()
+        else:
+            future = self._enqueue(user_id, priority)
+            try:
+                await asyncio.wait_for(asyncio.shield(future), timeout=wait_seconds)
+            except (asyncio.TimeoutError, asyncio.CancelledError) as err:
+                if future.done() and not future.cancelled():
+                    # Granted just as we gave up: hand the slot on
+                    self.running -= 1
+                    self._dispatch()
+                else:
+                    future.cancel()
+                    self._remove(user_id, priority, future)
+                    self._update_gauges()
+                if isinstance(err, asyncio.CancelledError):
+                    raise
+                raise self._reject("wait_timeout", 503, "Timed out waiting for capacity")
+
+        self.counters["admitted"] += 1
+        if cheap:
+            self.counters["admitted_cheap"] += 1
+        self._record_wait(time.monotonic() - started)
+
+    def release(self, service_seconds: float):
+        self.running -= 1
+        self.service_seconds = 0.8 * self.service_seconds + 0.2 * service_seconds
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, user_id: str, cheap: bool = False, max_wait: Optional[float] = None):
+        """Hold one of the model's concurrency slots for the duration of the block, waiting at most `max_wait` seconds for it"""
+        await self.acquire(user_id, cheap, max_wait)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - started)
+
+    def stats(self) -> Dict:
+        waits = sorted(self.recent_waits)
+        return {
+            "model": self.model,
+            "max_concurrency": self.max_concurrency,
+            "running": self.running,
+            "queue_depth": self.queued,
+            "queue_depth_cheap": self.queued_by_priority[CHEAP],
+            "queued_users": len(self.queued_per_user),
+            "wait_seconds": {
+                "count": self.wait_count,
+                "mean": self.wait_sum / self.wait_count if self.wait_count else 0.0,
+                "p95": waits[min(len(waits) - 1, int(len(waits) * 0.95))] if waits else 0.0,
+                "max": self.wait_max,
+            },
+            **self.counters,
+        }
+
+
+_controllers: Dict[str, AdmissionController] = {}
+
+
+def controller_for(model: str) -> AdmissionController:
+    """One controller (and so one concurrency limit) per model"""
+    if model not in _controllers:
+        _controllers[model] = AdmissionController(model)
+    return _controllers[model]
+
+
+def all_controllers() -> Dict[str, AdmissionController]:
+    return _controllers
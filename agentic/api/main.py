@@ -1,14 +1,24 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Request, Header
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Optional, List
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, Field
+from typing import Optional, List, Dict, Any
 from contextlib import asynccontextmanager
+import asyncio
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, REGISTRY, generate_latest
+from prometheus_client import multiprocess
 import logging
+import time
 from agentic.utils.get_env import get_env
 from sqlalchemy.orm import Session
 from agentic.agents.orchestrator import OrchestratorAgent
+from agentic.api.admission import AdmissionRejected, controller_for, all_controllers
+from agentic.api.warmup import StartupReport, prewarm, warm_up
 from agentic.database.connection import test_connection, get_db
+from agentic.database.embedding_sets import EmbeddingModelMismatch
 from agentic.database.models import Conversation, Message, User
+from agentic.utils.metrics import HTTP_REQUEST_SECONDS
 from uuid import UUID
 
 @asynccontextmanager
@@ -16,11 +26,42 @@ async def lifespan(app: FastAPI):
     # Startup
     runtime_env = get_env("RUNTIME_ENVIRONMENT")
     print(f"Runtime: {runtime_env}")
-    if not test_connection():
+    report = StartupReport()
+    app.state.startup = report
+
+    with report.step("database") as entry:
+        entry["ok"] = test_connection()
+    if not report.steps["database"]["ok"]:
         raise Exception("Failed to connect to database")
+
+    # An agent may already be set (e.g. bench/fake_app.py injects one with fake backends)
+    if getattr(app.state, "agent", None) is None:
+        with report.step("agent_init"):
+            app.state.agent = OrchestratorAgent()
+        if not report.steps["agent_init"]["ok"]:
+            raise Exception(f"Failed to build the agent: {report.steps['agent_init']['error']}")
+
+    # Serve /health and /ready while models load; /chat answers 503 until warm-up finishes
+    warmup_task = None
+    if get_env("WARMUP_ON_STARTUP", "true").lower() == "true":
+        async def run_warm_up():
+            await run_in_threadpool(warm_up, app.state.agent, report)
+            report.mark_ready()
+        warmup_task = asyncio.create_task(run_warm_up())
+    else:
+        report.mark_ready()
+
     print("API server started successfully!")
     yield
     # Shutdown
+    if warmup_task is not None and not warmup_task.done():
+        warmup_task.cancel()
+    agent = getattr(app.state, "agent", None)
+    if agent is not None:
+        agent.query_log.close()
+        snapshot = getattr(agent.structured_filter, "snapshot", None)
+        if snapshot is not None:
+            snapshot.stop()
     print("API server shutting down...")
 
 app = FastAPI(title="E-commerce RAG Agent API", version="1.0.0", lifespan=lifespan)
@@ -34,8 +75,31 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize the orchestrator agent
-agent = OrchestratorAgent()
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    HTTP_REQUEST_SECONDS.labels(
+        route.path if route else "unmatched", request.method, str(response.status_code)
+    ).observe(time.perf_counter() - started)
+    return response
+
+def get_agent(request: Request) -> OrchestratorAgent:
+    """The agent built at startup, once warm-up has finished"""
+    report = getattr(request.app.state, "startup", None)
+    agent = getattr(request.app.state, "agent", None)
+    if agent is None or (report is not None and not report.ready):
+        raise AdmissionRejected(503, "Service is warming up", retry_after=5)
+    return agent
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": exc.detail},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
 
 # In-memory session storage (use Redis in production)
 sessions = {}
@@ -44,10 +108,15 @@ class ChatRequest(BaseModel):
     message: str
     conversation_id: UUID
     user_id: UUID
+    # Capped at REQUEST_DEADLINE_SECONDS, which is also the default
+    deadline_seconds: Optional[float] = Field(default=None, gt=0)
 
 class ChatResponse(BaseModel):
     response: str
     conversation_id: UUID
+    served_by: str  # "llm" or "template"
+    timeouts: List[str] = []  # stages that hit the deadline
+    timings: Optional[Dict[str, Any]] = None  # per-stage breakdown, only with X-Debug-Timings
 
 class MessageModel(BaseModel):
     role: str
@@ -69,8 +138,62 @@ async def root():
 async def health_check():
     return {"status": "healthy", "database": "connected" if test_connection() else "disconnected"}
 
-@app.post("/chat", response_model=ChatResponse)
-async def chat_endpoint(request: ChatRequest, db: Session = Depends(get_db)):
+@app.get("/ready")
+async def readiness(request: Request):
+    """Readiness probe with the startup time breakdown; 503 until warm-up has finished"""
+    report = getattr(request.app.state, "startup", None)
+    if report is None:
+        return {"ready": True}
+    return JSONResponse(status_code=200 if report.ready else 503, content=report.to_dict())
+
+@app.get("/prewarm")
+async def prewarm_stats(request: Request, agent: OrchestratorAgent = Depends(get_agent)):
+    """Last pre-warm run and the hit rates its cache entries achieve"""
+    startup = getattr(request.app.state, "startup", None)
+    last_run = getattr(request.app.state, "last_prewarm", None) or (startup.steps.get("prewarm") if startup else None)
+    return {
+        "last_run": last_run,
+        "caches": {
+            "embedding": agent.semantic_search.embedding_cache.stats(),
+            "search_results": agent.result_cache.stats(),
+            "conversations": agent.conversations.stats(),
+        },
+        "query_log": {
+            "path": agent.query_log.path,
+            "written": agent.query_log.written,
+            "dropped": agent.query_log.dropped,
+            "rotations": agent.query_log.rotations,
+        },
+    }
+
+@app.post("/prewarm")
+async def rerun_prewarm(request: Request, agent: OrchestratorAgent = Depends(get_agent)):
+    """Re-mine popular queries and pre-warm again, e.g. after reindexing; cached results are dropped first"""
+    agent.result_cache.clear()
+    request.app.state.last_prewarm = await run_in_threadpool(prewarm, agent)
+    return request.app.state.last_prewarm
+
+@app.get("/admission")
+async def admission_stats():
+    """Queue depth, wait times and rejections per model"""
+    return {model: controller.stats() for model, controller in all_controllers().items()}
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics; aggregates all workers when PROMETHEUS_MULTIPROC_DIR is set"""
+    registry = REGISTRY
+    if get_env("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+@app.post("/chat", response_model=ChatResponse, response_model_exclude_none=True)
+async def chat_endpoint(
+    request: ChatRequest,
+    db: Session = Depends(get_db),
+    agent: OrchestratorAgent = Depends(get_agent),
+    x_debug_timings: Optional[str] = Header(default=None)
+):
     """Main chat endpoint for conversational product search"""
     try:
         # Get or create conversation
@@ -105,23 +228,43 @@ async def chat_endpoint(request: ChatRequest, db: Session = Depends(get_db)):
         # db.add(user_message)
         # db.commit()
         
-        # Get agent response
-        response = agent.chat(request.message)
+        # Get agent response; the agent blocks on model calls, so run it off the event loop
+        # Bounded concurrency and fair queueing in front of the agent's model
+        admission = controller_for(agent.llm.model)
+        cheap = agent.is_cheap(request.message, conversation_id=str(conversation.id))
+        # The deadline starts before admission so queueing counts against it
+        deadline = agent.new_deadline(request.deadline_seconds)
+        async with admission.slot(str(request.user_id), cheap=cheap, max_wait=deadline.remaining()):
+            result = await run_in_threadpool(
+                agent.chat, request.message, deadline=deadline,
+                conversation_id=str(conversation.id)
+            )
         
         # Add assistant message to database
         # assistant_message = Message(
         #     conversation_id=conversation.id,
-        #     content=response,
+        #     content=result["response"],
         #     role="assistant"
         # )
         # db.add(assistant_message)
         # db.commit()
         
         return ChatResponse(
-            response=response,
-            conversation_id=conversation.id
+            response=result["response"],
+            conversation_id=conversation.id,
+            served_by=result["served_by"],
+            timeouts=result["timeouts"],
+            timings=result["timings"] if x_debug_timings else None
         )
-        
+
+    except (HTTPException, AdmissionRejected):
+        raise
+
+    except EmbeddingModelMismatch as e:
+        # Searching would compare vectors from two models; refuse until the sets and models agree
+        db.rollback()
+        raise HTTPException(status_code=503, detail=str(e))
+
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
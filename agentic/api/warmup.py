@@ -0,0 +1,127 @@
+"""
+Startup warm-up so the first request is served like any other
+
+Ollama loads a model on its first request and the prompt prefix cache starts
+empty, so without warm-up the first user pays for both. The warm-up loads the
+chat and embedding models, primes the plan and response prompt prefixes,
+loads the catalog snapshot (if enabled) and the brand/category vocabulary,
+and pre-warms the embedding and search result caches with the most popular
+queries from the query log. Each step is timed and the breakdown is reported
+at startup and by GET /ready.
+"""
+import time
+from contextlib import contextmanager
+from typing import Dict, List
+from agentic.agents.orchestrator import OrchestratorAgent
+from agentic.prompts.templates import PLAN_TEMPLATE, RESPONSE_TEMPLATE
+from agentic.utils.get_env import get_env
+from agentic.utils.metrics import STARTUP_SECONDS
+from agentic.utils.query_log import popular_queries
+
+# Example queries from the README, used when neither the query log nor WARMUP_QUERIES_FILE has any
+DEFAULT_WARMUP_QUERIES = [
+    "I need comfortable running shoes",
+    "Show me Apple products under $500",
+    "What wireless headphones do you recommend?",
+    "Find Nike shoes for trail running",
+]
+
+
+def warmup_queries() -> List[str]:
+    """Fallback queries to pre-warm, one per line in WARMUP_QUERIES_FILE"""
+    path = get_env("WARMUP_QUERIES_FILE")
+    if not path:
+        return DEFAULT_WARMUP_QUERIES
+    try:
+        with open(path) as f:
+            return [line.strip() for line in f if line.strip()]
+    except OSError as e:
+        print(f"Failed to read warm-up queries from {path}: {e}")
+        return DEFAULT_WARMUP_QUERIES
+
+
+def prewarm(agent: OrchestratorAgent) -> Dict:
+    """Mine the top PREWARM_TOP_N queries from the query log and pre-warm the caches with them"""
+    started = time.perf_counter()
+    entries = popular_queries(
+        agent.query_log.path,
+        int(get_env("PREWARM_TOP_N", "100")),
+        int(get_env("PREWARM_LOG_LINES", "100000"))
+    )
+    source = "query_log"
+    if not entries:
+        entries = [{"query": query, "strategy": "semantic", "filters": {}} for query in warmup_queries()]
+        source = "defaults"
+    counts = agent.prewarm(entries)
+    return {
+        "source": source,
+        "ran_at": time.time(),
+        "ms": round((time.perf_counter() - started) * 1000, 1),
+        **counts,
+    }
+
+
+class StartupReport:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.steps: Dict[str, Dict] = {}
+        self.ready = False
+        self.ready_ms = None
+
+    @contextmanager
+    def step(self, name: str):
+        """Time a startup step; failures are recorded, not raised, so startup degrades instead of aborting"""
+        started = time.perf_counter()
+        entry = {"ok": True}
+        try:
+            yield entry
+        except Exception as e:
+            entry["ok"] = False
+            entry["error"] = str(e)
+            print(f"Startup step {name} failed: {e}")
+        finally:
+            duration = time.perf_counter() - started
+            entry["ms"] = round(duration * 1000, 1)
+            self.steps[name] = entry
+            STARTUP_SECONDS.labels(name).set(duration)
+
+    def mark_ready(self):
+        self.ready = True
+        self.ready_ms = round((time.perf_counter() - self.started) * 1000, 1)
+        STARTUP_SECONDS.labels("total").set(self.ready_ms / 1000)
+        summary = ", ".join(f"{name} {entry['ms']:.0f}ms{'' if entry['ok'] else ' (failed)'}" for name, entry in self.steps.items())
+        print(f"Ready in {self.ready_ms:.0f}ms: {summary}")
+
+    def to_dict(self) -> Dict:
+        return {"ready": self.ready, "ready_ms": self.ready_ms, "steps": self.steps}
+
+
+def warm_up(agent: OrchestratorAgent, report: StartupReport):
+    """Load models and prime caches; blocking, run off the event loop"""
+    queries = warmup_queries()
+    # A one-token generation loads the model and caches the static system prompt prefix
+    with report.step("chat_model"):
+        agent.llm.invoke(
+            RESPONSE_TEMPLATE.build(query=queries[0] if queries else "", search_results=""),
+            options={"num_predict": 1}
+        )
+    with report.step("plan_prompt"):
+        agent.planner.llm.invoke(PLAN_TEMPLATE.build(query=queries[0] if queries else ""), options={"num_predict": 1})
+    with report.step("embedding_model") as entry:
+        # Fails the step (and later searches) if the active embedding set was built with another model
+        embedding_set = agent.semantic_search.active_set()
+        model, embedding = agent.semantic_search.query_embedding
+        embedding_set.check(model, len(embedding.embed_query("warm up")))
+        entry["embedding_set"] = embedding_set.to_dict()
+    snapshot = getattr(agent.structured_filter, "snapshot", None)
+    if snapshot is not None:
+        with report.step("catalog_snapshot") as entry:
+            # Cached structured results may predate a catalog change
+            snapshot.on_change = agent.result_cache.clear
+            snapshot.load()
+            snapshot.listen()
+            entry["products"] = snapshot.stats()["products"]
+    with report.step("vocabulary"):
+        agent.load_vocabulary()
+    with report.step("prewarm") as entry:
+        entry.update(prewarm(agent))
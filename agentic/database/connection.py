@@ -1,14 +1,20 @@
 from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
+import re
 from dotenv import load_dotenv
 from agentic.utils.get_env import get_env
+from agentic.utils.deadline import Deadline, DeadlineExceeded
 
 # load_dotenv(dotenv_path='../../.env')
 
 DATABASE_URL = get_env("DATABASE_URL")
 
+SETTING_NAME = re.compile(r"^[a-z_]+(\.[a-z_]+)?$")
+SETTING_VALUE = re.compile(r"^[A-Za-z0-9_.]+$")
+
 engine = create_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
@@ -20,6 +26,29 @@ def get_db():
     finally:
         db.close()
 
+def apply_statement_timeout(db, deadline: Deadline, stage: str):
+    """Bound the statements of the current transaction by the request deadline"""
+    if deadline is None or db.bind.dialect.name != "postgresql":
+        return
+    timeout_ms = int(deadline.remaining() * 1000)
+    if timeout_ms <= 0:
+        raise DeadlineExceeded(stage)
+    # SET does not accept bind parameters; timeout_ms is an int we computed
+    db.execute(text(f"SET LOCAL statement_timeout = {timeout_ms}"))
+
+def apply_search_settings(db, settings: dict):
+    """SET LOCAL planner/index parameters (e.g. hnsw.ef_search) for the current transaction"""
+    if not settings or db.bind.dialect.name != "postgresql":
+        return
+    for name, value in settings.items():
+        # SET does not accept bind parameters, so only allow plain names and values
+        if not SETTING_NAME.match(name) or not SETTING_VALUE.match(str(value)):
+            raise ValueError(f"Invalid search setting {name}={value}")
+        db.execute(text(f"SET LOCAL {name} = {value}"))
+
+def is_statement_timeout(err: Exception) -> bool:
+    return isinstance(err, OperationalError) and "statement timeout" in str(err)
+
 def test_connection():
     try:
         with engine.connect() as connection:
@@ -0,0 +1,99 @@
+"""
+Versioned embedding sets
+
+Each set is a table of product vectors built by one embedding model at one
+dimension (see embedding/reindex.py). Exactly one set is active; search reads
+the active set's table and only accepts query vectors from the same model, so
+vectors from two models are never compared. With no active set, search falls
+back to the original product_embeddings table.
+"""
+import re
+import threading
+import time
+from typing import Optional
+from agentic.database.connection import SessionLocal, engine
+from agentic.database.models import EmbeddingSet
+from agentic.utils.get_env import get_env
+
+LEGACY_TABLE = "product_embeddings"
+TABLE_NAME = re.compile(r"^[a-z_][a-z0-9_]{0,62}$")
+
+
+class EmbeddingModelMismatch(Exception):
+    def __init__(self, query_model: Optional[str], embedding_set: "ActiveSet"):
+        super().__init__(
+            f"Query embedding model {query_model or 'unknown'} does not match the active embedding set "
+            f"{embedding_set.id} ({embedding_set.model}, {embedding_set.dimension} dimensions)"
+        )
+        self.query_model = query_model
+        self.embedding_set = embedding_set
+
+
+class ActiveSet:
+    def __init__(self, id: Optional[int], model: Optional[str], dimension: Optional[int], table_name: str):
+        if not TABLE_NAME.match(table_name):
+            raise ValueError(f"Invalid embedding set table name {table_name!r}")
+        self.id = id
+        self.model = model
+        self.dimension = dimension
+        self.table_name = table_name
+
+    @property
+    def legacy(self) -> bool:
+        return self.id is None
+
+    def check(self, query_model: Optional[str], vector_dimension: Optional[int] = None):
+        """Refuse query vectors from another model or of another dimension"""
+        if self.legacy:
+            return
+        if query_model != self.model or (vector_dimension is not None and vector_dimension != self.dimension):
+            raise EmbeddingModelMismatch(query_model, self)
+
+    def to_dict(self):
+        return {"id": self.id, "model": self.model, "dimension": self.dimension, "table": self.table_name}
+
+
+LEGACY_SET = ActiveSet(None, None, None, LEGACY_TABLE)
+
+
+class ActiveSetLookup:
+    """The active set, re-read every EMBEDDING_SET_REFRESH_SECONDS so a switch reaches every worker"""
+
+    def __init__(self, refresh_seconds: Optional[float] = None):
+        self.refresh_seconds = refresh_seconds if refresh_seconds is not None else float(get_env("EMBEDDING_SET_REFRESH_SECONDS", "30"))
+        self.current: Optional[ActiveSet] = None
+        self.checked_at = 0.0
+        self.lock = threading.Lock()
+
+    def _read(self) -> ActiveSet:
+        if engine.dialect.name != "postgresql":
+            return LEGACY_SET
+        db = SessionLocal()
+        try:
+            row = db.query(EmbeddingSet).filter(
+                EmbeddingSet.status == "active",
+                EmbeddingSet.deleted_at.is_(None)
+            ).first()
+        finally:
+            db.close()
+        if row is None:
+            return LEGACY_SET
+        return ActiveSet(row.id, row.model, row.dimension, row.table_name)
+
+    def get(self) -> ActiveSet:
+        if self.current is not None and time.monotonic() - self.checked_at < self.refresh_seconds:
+            return self.current
+        with self.lock:
+            if self.current is None or time.monotonic() - self.checked_at >= self.refresh_seconds:
+                try:
+                    active = self._read()
+                except Exception as e:
+                    # e.g. the embedding_sets migration has not run yet; keep what we had
+                    print(f"Failed to read the active embedding set: {e}")
+                    active = self.current or LEGACY_SET
+                if self.current is not None and active.id != self.current.id:
+                    print(f"Switched to embedding set {active.to_dict()}")
+                # One assignment, so a search sees either the old set or the new one
+                self.current = active
+                self.checked_at = time.monotonic()
+        return self.current
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DECIMAL, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Text, DECIMAL, DateTime, ForeignKey, Boolean, JSON
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import uuid
@@ -73,4 +73,18 @@ class Message(Base):
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
     deleted_at = Column(DateTime, nullable=True)
     
-    conversation = relationship("Conversation", back_populates="messages")
\ No newline at end of file
+    conversation = relationship("Conversation", back_populates="messages")
+
+class EmbeddingSet(Base):
+    __tablename__ = "embedding_sets"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    model = Column(String(255), nullable=False)  # '<provider>:<model>', e.g. 'ollama:qwen3:8b'
+    dimension = Column(Integer, nullable=False)
+    table_name = Column(String(63), unique=True, nullable=False)
+    status = Column(String(20), nullable=False)  # building, ready, active, retired or failed
+    metrics = Column(JSON, nullable=True)  # validation recall and latency
+    activated_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+    deleted_at = Column(DateTime, nullable=True)
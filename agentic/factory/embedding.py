@@ -1,13 +1,14 @@
 """
 Embedding Factory
 """
-from typing import List
+from typing import List, Union
 from enum import Enum
 from langchain_ollama import OllamaEmbeddings
 from agentic.factory.types import Model, Provider
+from agentic.utils.get_env import get_env
 
 class EmbeddingModel:
-    def __init__(self, provider: Provider = Provider.OLLAMA, model: Model = Model.QWEN3_8B):
+    def __init__(self, provider: Provider = Provider.OLLAMA, model: Union[Model, str] = Model.QWEN3_8B):
         self.provider = Provider.OLLAMA if provider is None else provider
         self.model = Model.QWEN3_8B if model is None else model
         self.embedding = self.get()
@@ -16,6 +17,16 @@ class EmbeddingModel:
         if self.provider == Provider.OLLAMA:
             return OllamaEmbeddings(
                 model=self.model,
+                # Keep the model loaded between requests instead of reloading it
+                keep_alive=int(get_env("OLLAMA_KEEP_ALIVE", "1800")),
+                # Hard ceiling for abandoned calls; per-request deadlines are enforced by the agent
+                client_kwargs={"timeout": float(get_env("OLLAMA_TIMEOUT_SECONDS", "60"))},
             )
 
         return None
+
+    @property
+    def name(self) -> str:
+        """'<provider>:<model>', the tag of embedding sets built with this model"""
+        model = self.model.value if isinstance(self.model, Enum) else self.model
+        return f"{self.provider.value}:{model}"
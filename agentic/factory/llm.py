@@ -4,17 +4,23 @@ LLM/SLM Models Factory
 from typing import List
 from enum import Enum
 from langchain_ollama import ChatOllama
-from agentic.factory.types import Model, Provider 
+from agentic.factory.types import Model, Provider
+from agentic.utils.get_env import get_env
 
 class LLMModel:
     def __init__(self, provider: Provider = Provider.OLLAMA, model: Model = Model.QWEN3_8B):
         self.provider = Provider.OLLAMA if provider is None else provider
         self.model = Model.QWEN3_8B if model is None else model
 
-    def get(self) -> List[float]:
+    def get(self, **kwargs) -> ChatOllama:
         if self.provider == Provider.OLLAMA:
             return ChatOllama(
                 model=self.model,
+                # Keep the model resident so its prompt cache survives between requests
+                keep_alive=int(get_env("OLLAMA_KEEP_ALIVE", "1800")),
+                # Hard ceiling for abandoned calls; per-request deadlines are enforced by the agent
+                client_kwargs={"timeout": float(get_env("OLLAMA_TIMEOUT_SECONDS", "60"))},
+                **kwargs,
             )
 
         return None
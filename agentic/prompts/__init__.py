@@ -0,0 +1 @@
+# Prompts package
\ No newline at end of file
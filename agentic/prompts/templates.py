@@ -0,0 +1,74 @@
+"""
+Prompt templates with a static system prefix
+
+Every template keeps its instructions in a system message that is byte-for-byte
+identical across requests, and puts all per-request content (query, search
+results) in the trailing user message. Ollama reuses the KV cache of the longest
+matching prompt prefix, so only the user message has to be prefilled.
+"""
+from typing import List
+from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage
+from agentic.system_message import SYSTEM_MESSAGE
+
+
+class PromptTemplate:
+    def __init__(self, system: str, user: str):
+        self.system = system.strip()
+        self.user = user.strip()
+
+    def build(self, **kwargs) -> List[BaseMessage]:
+        """Render the template into a stable system message and a dynamic user message"""
+        return [
+            SystemMessage(content=self.system),
+            HumanMessage(content=self.user.format(**kwargs)),
+        ]
+
+
+PLAN_TEMPLATE = PromptTemplate(
+    system="""
+Plan the product search for the user query. Return a JSON object with:
+
+- "strategy": one of
+  - "semantic" for natural language descriptions (e.g., "comfortable shoes for running")
+  - "structured" for specific filters (e.g., "Nike shoes under $100")
+  - "both" for mixed queries (e.g., "comfortable Nike shoes for running under $100")
+- "filters": an object with these possible keys (only include if mentioned):
+  - brand: string
+  - category: string
+  - min_price: number
+  - max_price: number
+  - name_contains: string
+- "listing": true when the user only wants matching products listed (e.g., "Show me Apple products under $500"),
+  false when they ask for advice, comparisons or recommendations for a use case
+
+Example: {"strategy": "structured", "filters": {"brand": "Nike", "max_price": 100}, "listing": true}
+""",
+    user='Query: "{query}"',
+)
+
+RESPONSE_TEMPLATE = PromptTemplate(
+    system=SYSTEM_MESSAGE + """
+
+Based on the search results, provide a response following your role as ProductFinder.
+""",
+    user="""
+User Query: "{query}"
+Search Results:
+{search_results}
+""",
+)
+
+# Used when little time is left before the request deadline: a fraction of the
+# prefill cost of RESPONSE_TEMPLATE and a shorter answer
+SHORT_RESPONSE_TEMPLATE = PromptTemplate(
+    system="""
+You are ProductFinder, a product search assistant. Recommend up to 3 of the search results
+as a short markdown list with name, price and one line on why each fits the query.
+Do not invent products. End by offering to refine the search.
+""",
+    user="""
+User Query: "{query}"
+Search Results:
+{search_results}
+""",
+)
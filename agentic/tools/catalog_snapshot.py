@@ -0,0 +1,300 @@
+"""
+In-process columnar snapshot of the product catalog
+
+The catalog changes rarely, so structured filtering can be served from memory
+instead of an ILIKE scan per query. Prices live in a NumPy array (NaN for NULL),
+brand and category are dictionary-encoded as integer codes (-1 for NULL), and
+the rows themselves are compact __slots__ records, all ordered by product id.
+Filters have the semantics of StructuredFilterTool.filter_products: ILIKE
+substring matches (with % and _ wildcards), NULL prices never match a price
+bound, results ordered by id and limited.
+
+The snapshot listens on the product_changes channel (see the
+product_change_notify migration) and re-reads only the products that changed.
+"""
+import re
+import select
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+import numpy as np
+from agentic.database.connection import engine, get_db
+from agentic.database.models import Product
+from agentic.utils.get_env import get_env
+
+CHANNEL = "product_changes"
+COLUMNS = (Product.id, Product.name, Product.brand, Product.category, Product.description, Product.usage, Product.price, Product.image_url)
+
+
+class ProductRecord:
+    __slots__ = ("id", "name", "brand", "category", "description", "usage", "price", "image_url")
+
+    def __init__(self, id, name, brand, category, description, usage, price, image_url):
+        self.id = id
+        self.name = name
+        self.brand = brand
+        self.category = category
+        self.description = description
+        self.usage = usage
+        self.price = float(price) if price is not None else None
+        self.image_url = image_url
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Same shape as a filter_products row"""
+        return {
+            "id": self.id,
+            "name": self.name,
+            "brand": self.brand,
+            "category": self.category,
+            "description": self.description,
+            "usage": self.usage,
+            "price": self.price if self.price else None,
+            "image_url": self.image_url,
+        }
+
+
+def ilike_pattern(term: str) -> "re.Pattern":
+    """Compile `%term%` as PostgreSQL ILIKE matches it: % is any run, _ any one character, backslash escapes"""
+    pieces = []
+    escaped = False
+    for char in term:
+        if escaped:
+            pieces.append(re.escape(char))
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif char == "%":
+            pieces.append(".*")
+        elif char == "_":
+            pieces.append(".")
+        else:
+            pieces.append(re.escape(char))
+    return re.compile("".join(pieces), re.IGNORECASE | re.DOTALL)
+
+
+def price_value(record: ProductRecord) -> float:
+    return np.nan if record.price is None else record.price
+
+
+class Dictionary:
+    """Distinct values and their integer codes; codes are never reused, so old arrays stay valid"""
+
+    def __init__(self):
+        self.values: List[str] = []
+        self.codes: Dict[str, int] = {}
+
+    def encode(self, value: Optional[str]) -> int:
+        if value is None:
+            return -1
+        if value not in self.codes:
+            self.codes[value] = len(self.values)
+            self.values.append(value)
+        return self.codes[value]
+
+    def matching(self, term: str) -> np.ndarray:
+        pattern = ilike_pattern(term)
+        return np.array([code for code, value in enumerate(self.values) if pattern.search(value)], dtype=np.int32)
+
+
+class Columns:
+    """One immutable version of the snapshot; changes build a new one so readers never see a partial update"""
+
+    def __init__(self, records: List[ProductRecord], ids: np.ndarray, prices: np.ndarray, brand_codes: np.ndarray, category_codes: np.ndarray):
+        self.records = records
+        self.ids = ids
+        self.prices = prices
+        self.brand_codes = brand_codes
+        self.category_codes = category_codes
+
+    @classmethod
+    def build(cls, records: List[ProductRecord], brands: Dictionary, categories: Dictionary) -> "Columns":
+        return cls(
+            records,
+            np.array([record.id for record in records], dtype=np.int64),
+            np.array([price_value(record) for record in records], dtype=np.float64),
+            np.array([brands.encode(record.brand) for record in records], dtype=np.int32),
+            np.array([categories.encode(record.category) for record in records], dtype=np.int32),
+        )
+
+    def patch(self, ids: Iterable[int], fresh: Dict[int, ProductRecord], brands: Dictionary, categories: Dictionary) -> "Columns":
+        """Copy with the given ids replaced by their fresh rows, inserted if new, dropped if gone"""
+        records = list(self.records)
+        product_ids = self.ids.copy()
+        prices = self.prices.copy()
+        brand_codes = self.brand_codes.copy()
+        category_codes = self.category_codes.copy()
+        for product_id in sorted(ids):
+            row = int(np.searchsorted(product_ids, product_id))
+            present = row < len(product_ids) and product_ids[row] == product_id
+            record = fresh.get(product_id)
+            if record is None:
+                if present:
+                    del records[row]
+                    product_ids = np.delete(product_ids, row)
+                    prices = np.delete(prices, row)
+                    brand_codes = np.delete(brand_codes, row)
+                    category_codes = np.delete(category_codes, row)
+            elif present:
+                records[row] = record
+                prices[row] = price_value(record)
+                brand_codes[row] = brands.encode(record.brand)
+                category_codes[row] = categories.encode(record.category)
+            else:
+                records.insert(row, record)
+                product_ids = np.insert(product_ids, row, product_id)
+                prices = np.insert(prices, row, price_value(record))
+                brand_codes = np.insert(brand_codes, row, brands.encode(record.brand))
+                category_codes = np.insert(category_codes, row, categories.encode(record.category))
+        return Columns(records, product_ids, prices, brand_codes, category_codes)
+
+
+class CatalogSnapshot:
+    def __init__(self, on_change: Optional[Callable[[], None]] = None):
+        self.brands = Dictionary()
+        self.categories = Dictionary()
+        self.columns: Optional[Columns] = None
+        self.on_change = on_change
+        self.lock = threading.Lock()
+        self.debounce_seconds = float(get_env("CATALOG_SNAPSHOT_DEBOUNCE_SECONDS", "0.5"))
+        self.stopping = threading.Event()
+        self.listener: Optional[threading.Thread] = None
+        self.loaded_at: Optional[float] = None
+        self.changes_applied = 0
+
+    @property
+    def loaded(self) -> bool:
+        return self.columns is not None
+
+    def _fetch(self, ids: Optional[Iterable[int]] = None) -> List[ProductRecord]:
+        db = next(get_db())
+        try:
+            query = db.query(*COLUMNS)
+            if ids is not None:
+                query = query.filter(Product.id.in_(list(ids)))
+            return [ProductRecord(*row) for row in query.order_by(Product.id)]
+        finally:
+            db.close()
+
+    def load(self):
+        """Read the whole catalog"""
+        records = self._fetch()
+        with self.lock:
+            self.columns = Columns.build(records, self.brands, self.categories)
+            self.loaded_at = time.time()
+        print(f"Catalog snapshot loaded: {len(records)} products")
+
+    def apply_changes(self, ids: Iterable[int]):
+        """Re-read the given products; rows that no longer exist are dropped"""
+        ids = set(ids)
+        if not ids:
+            return
+        fresh = {record.id: record for record in self._fetch(ids)}
+        with self.lock:
+            self.columns = self.columns.patch(ids, fresh, self.brands, self.categories)
+            self.changes_applied += len(ids)
+        if self.on_change is not None:
+            self.on_change()
+
+    def filter(
+        self,
+        brand: Optional[str] = None,
+        category: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        name_contains: Optional[str] = None,
+        limit: int = 20
+    ) -> List[Dict[str, Any]]:
+        columns = self.columns
+        mask = np.ones(len(columns.records), dtype=bool)
+        if brand:
+            mask &= np.isin(columns.brand_codes, self.brands.matching(brand))
+        if category:
+            mask &= np.isin(columns.category_codes, self.categories.matching(category))
+        # NaN (NULL) prices compare False, as NULL does in SQL
+        if min_price is not None:
+            mask &= columns.prices >= min_price
+        if max_price is not None:
+            mask &= columns.prices <= max_price
+
+        rows = np.flatnonzero(mask)
+        if name_contains:
+            pattern = ilike_pattern(name_contains)
+            matches = []
+            for row in rows:
+                if pattern.search(columns.records[row].name or ""):
+                    matches.append(row)
+                    if len(matches) == limit:
+                        break
+            rows = matches
+        return [columns.records[row].to_dict() for row in rows[:limit]]
+
+    def vocabulary(self) -> Dict[str, List[str]]:
+        columns = self.columns
+        return {
+            "brands": [self.brands.values[code] for code in np.unique(columns.brand_codes) if code >= 0],
+            "categories": [self.categories.values[code] for code in np.unique(columns.category_codes) if code >= 0],
+        }
+
+    def listen(self):
+        """Apply change notifications in a background thread (PostgreSQL only)"""
+        if engine.dialect.name != "postgresql" or self.listener is not None:
+            return
+        self.stopping.clear()
+        self.listener = threading.Thread(target=self._listen, name="catalog-snapshot", daemon=True)
+        self.listener.start()
+
+    def stop(self):
+        self.stopping.set()
+        if self.listener is not None:
+            self.listener.join(timeout=5)
+            self.listener = None
+
+    def _listen(self):
+        reconnecting = False
+        while not self.stopping.is_set():
+            connection = None
+            try:
+                # A dedicated connection: detached, it is closed instead of returned to the request pool
+                connection = engine.raw_connection()
+                connection.detach()
+                driver = connection.driver_connection
+                driver.autocommit = True
+                driver.cursor().execute(f"LISTEN {CHANNEL}")
+                if reconnecting:
+                    # Notifications sent while disconnected are lost
+                    self.load()
+                    if self.on_change is not None:
+                        self.on_change()
+                reconnecting = True
+                while not self.stopping.is_set():
+                    if select.select([driver], [], [], 1.0) == ([], [], []):
+                        continue
+                    # Collect a burst (e.g. a bulk import) into one refresh
+                    time.sleep(self.debounce_seconds)
+                    driver.poll()
+                    payloads = [notify.payload for notify in driver.notifies]
+                    driver.notifies.clear()
+                    if "" in payloads:
+                        self.load()
+                        if self.on_change is not None:
+                            self.on_change()
+                    else:
+                        self.apply_changes(int(payload) for payload in payloads)
+            except Exception as e:
+                print(f"Catalog snapshot listener error, reconnecting: {e}")
+                self.stopping.wait(5)
+            finally:
+                if connection is not None:
+                    connection.close()
+
+    def stats(self) -> Dict[str, Any]:
+        columns = self.columns
+        return {
+            "loaded": self.loaded,
+            "products": len(columns.records) if columns else 0,
+            "brands": len(self.brands.values),
+            "categories": len(self.categories.values),
+            "loaded_at": self.loaded_at,
+            "changes_applied": self.changes_applied,
+            "listening": self.listener is not None,
+        }
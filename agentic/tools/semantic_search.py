@@ -1,44 +1,165 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 import google.generativeai as genai
 import os
 from agentic.database.models import Product, ProductEmbedding
-from agentic.database.connection import get_db
+from agentic.database.connection import get_db, apply_search_settings, apply_statement_timeout, is_statement_timeout
+from agentic.database.embedding_sets import ActiveSet, ActiveSetLookup, EmbeddingModelMismatch
 from agentic.factory.embedding import EmbeddingModel
+from agentic.utils.query_cache import QueryCache
+from agentic.utils.deadline import Deadline, DeadlineExceeded, run_with_deadline
+from agentic.utils.get_env import get_env
+from agentic.utils.tracing import span
+from agentic.utils.result_serializer import ResultSerializer
 
 
 class SemanticSearchTool:
-    def __init__(self):
-        self.embedding = EmbeddingModel().embedding
+    def __init__(self, embedding=None, embedding_model: Optional[str] = None):
+        # Query embeddings built here follow the active embedding set's model; injected ones are fixed
+        self.owns_embedding = embedding is None
+        if embedding is None:
+            factory = EmbeddingModel()
+            embedding, embedding_model = factory.embedding, factory.name
+        # ('<provider>:<model>', embeddings), swapped as one so a vector is always tagged with its model
+        self.query_embedding: Tuple[Optional[str], Any] = (embedding_model, embedding)
+        self.embedding_sets = ActiveSetLookup()
+        self.serializer = ResultSerializer()
+        self.embedding_timeout = float(get_env("EMBEDDING_TIMEOUT_SECONDS", "5"))
+        self.embedding_cache = QueryCache("embedding", int(get_env("EMBEDDING_CACHE_SIZE", "1024")))
+        self.top_k = int(get_env("SEARCH_TOP_K", "5"))
+        # Vector index parameters applied per query; measure changes with bench/eval_retrieval.py
+        self.search_settings = {
+            name: value for name, value in (
+                ("hnsw.ef_search", get_env("HNSW_EF_SEARCH")),
+                ("ivfflat.probes", get_env("IVFFLAT_PROBES")),
+            ) if value
+        }
 
-    def get_embedding(self, text: str) -> List[float]:
-        """Generate embedding for given text using Embedding"""
-        result = self.embedding.embed_query(text)
-        return result
+    @property
+    def embedding(self):
+        return self.query_embedding[1]
 
-    def search_products(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
-        """Search for products using semantic similarity"""
+    @property
+    def embedding_model(self) -> Optional[str]:
+        return self.query_embedding[0]
+
+    def active_set(self) -> ActiveSet:
+        """The active embedding set; follows a switch to another Ollama model by loading that model"""
+        active = self.embedding_sets.get()
+        model = self.embedding_model
+        if not active.legacy and active.model != model and self.owns_embedding and active.model.startswith("ollama:"):
+            factory = EmbeddingModel(model=active.model.split(":", 1)[1])
+            print(f"Query embeddings switch from {model} to {factory.name}")
+            self.query_embedding = (factory.name, factory.embedding)
+        return active
+
+    def embed(self, text: str, deadline: Optional[Deadline] = None) -> Tuple[Optional[str], List[float]]:
+        """Embedding for the text and the model that produced it, served from the cache when seen before"""
+        model, embedding = self.query_embedding
+        key = f"{model}|{text}"
+        cached = self.embedding_cache.get(key)
+        if cached is not None:
+            return model, cached
+        with span("embedding"):
+            result = run_with_deadline(
+                embedding.embed_query, deadline, "embedding", text,
+                stage_budget=self.embedding_timeout
+            )
+        self.embedding_cache.put(key, result)
+        return model, result
+
+    def get_embedding(self, text: str, deadline: Optional[Deadline] = None) -> List[float]:
+        """Generate embedding for given text using Embedding, served from the cache when seen before"""
+        return self.embed(text, deadline)[1]
+
+    def warm_embeddings(self, queries: List[str]) -> int:
+        """Embed queries ahead of time as pre-warmed cache entries; returns how many were not cached yet"""
+        model, embedding = self.query_embedding
+        embedded = 0
+        for query in queries:
+            key = f"{model}|{query}"
+            if key not in self.embedding_cache:
+                self.embedding_cache.put(key, embedding.embed_query(query), prewarmed=True)
+                embedded += 1
+        return embedded
+
+    def _filter_clause(self, filters: Optional[Dict[str, Any]]) -> Tuple[str, Dict[str, Any]]:
+        """Translate structured filters into a WHERE clause with the same semantics as filter_products"""
+        if not filters:
+            return "", {}
+
+        conditions = []
+        params = {}
+        for key, column in (("brand", "p.brand"), ("category", "p.category"), ("name_contains", "p.name")):
+            if filters.get(key):
+                conditions.append(f"{column} ILIKE :{key}")
+                params[key] = f"%{filters[key]}%"
+        if filters.get("min_price") is not None:
+            conditions.append("p.price >= :min_price")
+            params["min_price"] = filters["min_price"]
+        if filters.get("max_price") is not None:
+            conditions.append("p.price <= :max_price")
+            params["max_price"] = filters["max_price"]
+
+        if not conditions:
+            return "", {}
+        return "WHERE " + " AND ".join(conditions), params
+
+    def search_products(
+        self,
+        query: str,
+        top_k: Optional[int] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        deadline: Optional[Deadline] = None,
+        pairwise: bool = False
+    ) -> List[Dict[str, Any]]:
+        """Search for products using semantic similarity, optionally restricted by structured filters
+
+        With `pairwise`, each product also carries its similarity to every result (in result order) for re-ranking.
+        """
         db = next(get_db())
         try:
-            # Get query embedding
-            search_vector = self.get_embedding(query)
+            # Get query embedding, refusing vectors the active set was not built with
+            embedding_set = self.active_set()
+            query_model, search_vector = self.embed(query, deadline)
+            embedding_set.check(query_model, len(search_vector))
             search_vector_text = '[' + ','.join(map(str, search_vector)) + ']'
+            where_clause, filter_params = self._filter_clause(filters)
 
             # Perform vector similarity search
-            sql_query = text("""
-                SELECT p.*, pe.document_text,
+            nearest = f"""
+                SELECT p.*, pe.document_text,{" pe.embedding AS candidate_embedding," if pairwise else ""}
                        (pe.embedding <=> cast(:query_embedding as vector)) as distance
                 FROM products p
-                JOIN product_embeddings pe ON p.id = pe.product_id
+                JOIN {embedding_set.table_name} pe ON p.id = pe.product_id
+                {where_clause}
                 ORDER BY pe.embedding <=> cast(:query_embedding as vector)
                 LIMIT :limit
-            """)
+            """
+            if pairwise:
+                # Compare the candidates next to their vectors instead of transferring them
+                nearest = f"""
+                    WITH candidates AS ({nearest})
+                    SELECT c.id, c.name, c.brand, c.category, c.description, c.usage, c.price, c.image_url,
+                           c.document_text, c.distance,
+                           ARRAY(
+                               SELECT 1 - (c.candidate_embedding <=> o.candidate_embedding)
+                               FROM candidates o ORDER BY o.distance, o.id
+                           ) as pairwise_similarities
+                    FROM candidates c
+                    ORDER BY c.distance, c.id
+                """
+            sql_query = text(nearest)
 
-            result = db.execute(sql_query, {
-                "query_embedding": search_vector_text,
-                "limit": top_k
-            })
+            with span("sql.semantic_search"):
+                apply_statement_timeout(db, deadline, "semantic_search")
+                apply_search_settings(db, self.search_settings)
+                result = db.execute(sql_query, {
+                    "query_embedding": search_vector_text,
+                    "limit": top_k or self.top_k,
+                    **filter_params
+                }).fetchall()
 
             products = []
             for row in result:
@@ -53,10 +174,17 @@ class SemanticSearchTool:
                     "image_url": row.image_url,
                     "similarity_score": 1 - row.distance  # Convert distance to similarity
                 })
+                if pairwise:
+                    products[-1]["pairwise_similarities"] = row.pairwise_similarities
 
             return products
 
+        except (DeadlineExceeded, EmbeddingModelMismatch):
+            raise
+
         except Exception as err:
+            if is_statement_timeout(err):
+                raise DeadlineExceeded("semantic_search")
             print(f"Error during semantic search: {err}")
             return []
 
@@ -70,12 +198,4 @@ class SemanticSearchTool:
         if not products:
             return "No products found matching your query."
 
-        result = f"Found {len(products)} products matching '{query}':\n\n"
-        for product in products:
-            result += f"• {product['name']} by {product['brand']}\n"
-            result += f"  Category: {product['category']}\n"
-            result += f"  Price: ${product['price']}\n"
-            result += f"  Description: {product['description']}\n"
-            result += f"  Similarity: {product['similarity_score']:.2f}\n\n"
-
-        return result
+        return self.serializer.serialize(products, query).text
@@ -2,11 +2,19 @@ from typing import List, Dict, Any, Optional
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_
 from agentic.database.models import Product
-from agentic.database.connection import get_db
+from agentic.database.connection import get_db, apply_statement_timeout, is_statement_timeout
+from agentic.utils.deadline import Deadline, DeadlineExceeded
+from agentic.utils.get_env import get_env
+from agentic.utils.tracing import span
+from agentic.utils.result_serializer import ResultSerializer
+from agentic.tools.catalog_snapshot import CatalogSnapshot
 
 class StructuredFilterTool:
     def __init__(self):
-        pass
+        self.limit = int(get_env("STRUCTURED_FILTER_LIMIT", "20"))
+        self.serializer = ResultSerializer()
+        # Serve filters from memory once the snapshot is loaded (at warm-up)
+        self.snapshot = CatalogSnapshot() if get_env("CATALOG_SNAPSHOT", "false").lower() == "true" else None
     
     def filter_products(
         self,
@@ -14,9 +22,15 @@ class StructuredFilterTool:
         category: Optional[str] = None,
         min_price: Optional[float] = None,
         max_price: Optional[float] = None,
-        name_contains: Optional[str] = None
+        name_contains: Optional[str] = None,
+        limit: Optional[int] = None,
+        deadline: Optional[Deadline] = None
     ) -> List[Dict[str, Any]]:
         """Filter products based on structured criteria"""
+        if self.snapshot is not None and self.snapshot.loaded:
+            with span("snapshot.structured_filter"):
+                return self.snapshot.filter(brand, category, min_price, max_price, name_contains, limit or self.limit)
+
         db = next(get_db())
         try:
             query = db.query(Product)
@@ -37,7 +51,9 @@ class StructuredFilterTool:
             if name_contains:
                 query = query.filter(Product.name.ilike(f"%{name_contains}%"))
             
-            products = query.all()
+            with span("sql.structured_filter"):
+                apply_statement_timeout(db, deadline, "structured_filter")
+                products = query.order_by(Product.id).limit(limit or self.limit).all()
             
             result = []
             for product in products:
@@ -53,9 +69,26 @@ class StructuredFilterTool:
                 })
             
             return result
+
+        except Exception as err:
+            if is_statement_timeout(err):
+                raise DeadlineExceeded("structured_filter")
+            raise
             
         finally:
             db.close()
+
+    def vocabulary(self) -> Dict[str, List[str]]:
+        """Distinct brand and category names, used by the rule-based filter parser"""
+        if self.snapshot is not None and self.snapshot.loaded:
+            return self.snapshot.vocabulary()
+        db = next(get_db())
+        try:
+            brands = [row[0] for row in db.query(Product.brand).distinct() if row[0]]
+            categories = [row[0] for row in db.query(Product.category).distinct() if row[0]]
+            return {"brands": brands, "categories": categories}
+        finally:
+            db.close()
     
     def __call__(self, filters: Dict[str, Any]) -> str:
         """Tool interface for LangGraph agent"""
@@ -64,11 +97,5 @@ class StructuredFilterTool:
         if not products:
             return "No products found matching the specified criteria."
         
-        result = f"Found {len(products)} products matching your criteria:\n\n"
-        for product in products:
-            result += f"• {product['name']} by {product['brand']}\n"
-            result += f"  Category: {product['category']}\n"
-            result += f"  Price: ${product['price']}\n"
-            result += f"  Description: {product['description']}\n\n"
-        
-        return result
\ No newline at end of file
+        header = f"Found {len(products)} products matching your criteria:"
+        return self.serializer.serialize(products, header=header).text
@@ -0,0 +1,235 @@
+"""
+Per-conversation candidate sets for follow-up questions
+
+A search ranks more candidates than one answer shows. The ranked list is kept
+per conversation, so follow-ups such as "show me more", "cheaper ones",
+"sort by price" or "no Nike" page through or refine it without embedding the
+query or querying pgvector again. Sets expire after CONVERSATION_CACHE_TTL_SECONDS
+and the least recently used conversations are evicted beyond
+CONVERSATION_CACHE_SIZE entries or CONVERSATION_CACHE_MAX_MB of products.
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from agentic.utils.get_env import get_env
+
+MORE_PATTERN = re.compile(
+    r"^(?:(?:show|give|get|see|list)\s+(?:me\s+)?)?(?:some\s+)?(?:more|others?|next|another|what else|anything else)"
+    r"(?:\s+(?:ones?|options?|results?|products?|items?|page|please))*$"
+)
+CHEAPER_PATTERN = re.compile(r"\b(?:cheaper|less expensive|lower[- ]priced|more affordable)\b")
+PRICIER_PATTERN = re.compile(r"\b(?:pricier|more expensive|higher[- ]end|fancier)\b")
+PRICE_ASC_PATTERN = re.compile(r"\b(?:(?:sort|order)\w*\s+(?:them\s+|it\s+)?by\s+(?:lowest\s+)?price|cheapest first|low(?:est)? to high(?:est)?)\b")
+PRICE_DESC_PATTERN = re.compile(r"\b(?:(?:sort|order)\w*\s+(?:them\s+|it\s+)?by\s+highest\s+price|most expensive first|high(?:est)? to low(?:est)?)\b")
+EXCLUDE_PREFIX = r"\b(?:no|not|without|except|excluding|exclude|other than|besides|anything but)\s+(?:from\s+)?(?:any\s+)?(?:more\s+)?"
+# Follow-ups are short; anything longer is treated as a new question
+MAX_FOLLOW_UP_WORDS = 10
+NOTHING_TO_CONTINUE = (
+    "There is no earlier search in this conversation to continue. "
+    "What would you like me to look for?"
+)
+
+
+def _words(text: str) -> str:
+    return " ".join(re.sub(r"[^\w$'&.\s-]", " ", text.lower()).split()).strip(" .")
+
+
+def _price(product: Dict[str, Any]) -> Optional[float]:
+    return product.get("price")
+
+
+def _size_bytes(products: List[Dict[str, Any]]) -> int:
+    return sum(
+        200 + sum(len(value) for value in product.values() if isinstance(value, str))
+        for product in products
+    )
+
+
+class FollowUp:
+    def __init__(self, more: bool = False, order: Optional[str] = None, cheaper: bool = False, pricier: bool = False, exclude: Optional[List[str]] = None):
+        self.more = more
+        self.order = order  # "price_asc" or "price_desc"
+        self.cheaper = cheaper
+        self.pricier = pricier
+        self.exclude = exclude or []
+
+    def __bool__(self) -> bool:
+        return self.more or bool(self.order) or self.cheaper or self.pricier or bool(self.exclude)
+
+
+def parse_follow_up(message: str, brands: Iterable[str] = ()) -> Optional[FollowUp]:
+    """Recognize a follow-up to an earlier listing, or None if the message asks something new
+
+    `brands` are the names a "no <brand>" may exclude.
+    """
+    text = _words(message)
+    if not text or len(text.split()) > MAX_FOLLOW_UP_WORDS:
+        return None
+    follow_up = FollowUp(
+        more=bool(MORE_PATTERN.match(text)),
+        order="price_asc" if PRICE_ASC_PATTERN.search(text) else "price_desc" if PRICE_DESC_PATTERN.search(text) else None,
+        cheaper=bool(CHEAPER_PATTERN.search(text)),
+        pricier=bool(PRICIER_PATTERN.search(text)),
+        exclude=[
+            brand for brand in sorted({brand for brand in brands if brand}, key=len, reverse=True)
+            if re.search(rf"{EXCLUDE_PREFIX}{re.escape(brand.lower())}s?\b", text)
+        ],
+    )
+    return follow_up or None
+
+
+class CandidateSet:
+    def __init__(self, query: str, strategy: str, filters: Dict[str, Any], products: List[Dict[str, Any]], shown: int):
+        self.query = query
+        self.strategy = strategy
+        self.filters = filters
+        # Ranked candidates; the first `shown` were in the answer
+        self.products = products
+        self.shown_ids = {product.get("id") for product in products[:shown]}
+        self.last_page = products[:shown]
+        self.order = "rank"
+        self.excluded: set = set()
+        self.min_price: Optional[float] = None
+        self.max_price: Optional[float] = None
+        self.size_bytes = _size_bytes(products)
+        # Follow-ups on one conversation may run concurrently; paging must not hand out a page twice
+        self.lock = threading.Lock()
+
+    def brands(self) -> List[str]:
+        return sorted({product["brand"] for product in self.products if product.get("brand")}, key=len, reverse=True)
+
+    def _ordered(self) -> List[Dict[str, Any]]:
+        if self.order == "rank":
+            return self.products
+        priced = [product for product in self.products if _price(product) is not None]
+        unpriced = [product for product in self.products if _price(product) is None]
+        return sorted(priced, key=_price, reverse=self.order == "price_desc") + unpriced
+
+    def price_bounds(self, follow_up: FollowUp) -> Tuple[Optional[float], Optional[float]]:
+        """(min_price, max_price) after the follow-up: cheaper/pricier than anything on the last page"""
+        min_price, max_price = self.min_price, self.max_price
+        shown_prices = [_price(product) for product in self.last_page if _price(product) is not None]
+        if follow_up.cheaper and shown_prices:
+            max_price = min(shown_prices)
+        if follow_up.pricier and shown_prices:
+            min_price = max(shown_prices)
+        return min_price, max_price
+
+    def search_filters(self, follow_up: FollowUp) -> Dict[str, Any]:
+        """The original search's filters narrowed by the follow-up's price bounds, to fetch more matches"""
+        filters = dict(self.filters)
+        min_price, max_price = self.price_bounds(follow_up)
+        if min_price is not None:
+            filters["min_price"] = min_price if filters.get("min_price") is None else max(min_price, filters["min_price"])
+        if max_price is not None:
+            filters["max_price"] = max_price if filters.get("max_price") is None else min(max_price, filters["max_price"])
+        return filters
+
+    def extend(self, products: List[Dict[str, Any]]) -> int:
+        """Append products the set does not hold yet, e.g. further matches; returns how many were new"""
+        with self.lock:
+            known = {product.get("id") for product in self.products}
+            added = [product for product in products if product.get("id") not in known]
+            self.products = self.products + added
+            self.size_bytes += _size_bytes(added)
+            return len(added)
+
+    def next_page(self, follow_up: FollowUp, page_size: int) -> List[Dict[str, Any]]:
+        """Apply the follow-up and return the products to show; empty if the set cannot answer it"""
+        with self.lock:
+            return self._next_page(follow_up, page_size)
+
+    def _next_page(self, follow_up: FollowUp, page_size: int) -> List[Dict[str, Any]]:
+        excluded = self.excluded | {brand.lower() for brand in follow_up.exclude}
+        order = follow_up.order or ("price_asc" if follow_up.cheaper else "price_desc" if follow_up.pricier else self.order)
+        min_price, max_price = self.price_bounds(follow_up)
+
+        previous = self.order
+        self.order = order
+        pool = [
+            product for product in self._ordered()
+            if (product.get("brand") or "").lower() not in excluded
+            and (max_price is None or (_price(product) is not None and _price(product) < max_price))
+            and (min_price is None or (_price(product) is not None and _price(product) > min_price))
+            and (not follow_up.more or product.get("id") not in self.shown_ids)
+        ]
+        page = pool[:page_size]
+        if not page:
+            self.order = previous
+            return []
+
+        # Refinements stick for later pages
+        self.excluded, self.min_price, self.max_price = excluded, min_price, max_price
+        self.shown_ids.update(product.get("id") for product in page)
+        self.last_page = page
+        return [dict(product) for product in page]
+
+
+class ConversationCache:
+    def __init__(self, max_entries: Optional[int] = None, ttl_seconds: Optional[float] = None, max_bytes: Optional[int] = None):
+        self.max_entries = max_entries if max_entries is not None else int(get_env("CONVERSATION_CACHE_SIZE", "1000"))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(get_env("CONVERSATION_CACHE_TTL_SECONDS", "1800"))
+        self.max_bytes = max_bytes if max_bytes is not None else int(float(get_env("CONVERSATION_CACHE_MAX_MB", "64")) * 1024 * 1024)
+        # conversation_id -> (candidate set, stored_at, bytes counted for it)
+        self.entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.size_bytes = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, conversation_id: str) -> Optional[CandidateSet]:
+        with self.lock:
+            entry = self.entries.get(conversation_id)
+            if entry is not None and time.monotonic() - entry[1] > self.ttl_seconds:
+                self._remove(conversation_id)
+                entry = None
+            if entry is None:
+                return None
+            self.entries.move_to_end(conversation_id)
+            return entry[0]
+
+    def put(self, conversation_id: str, candidates: CandidateSet):
+        """Store or re-store a set; re-storing after it grew accounts for its new size"""
+        with self.lock:
+            if conversation_id in self.entries:
+                self._remove(conversation_id)
+            size_bytes = candidates.size_bytes
+            if self.max_entries <= 0 or size_bytes > self.max_bytes:
+                return
+            self.entries[conversation_id] = (candidates, time.monotonic(), size_bytes)
+            self.size_bytes += size_bytes
+            while len(self.entries) > self.max_entries or self.size_bytes > self.max_bytes:
+                self._remove(next(iter(self.entries)))
+                self.evictions += 1
+
+    def discard(self, conversation_id: str):
+        with self.lock:
+            if conversation_id in self.entries:
+                self._remove(conversation_id)
+
+    def _remove(self, conversation_id: str):
+        # The size counted at put(); the set may have grown since
+        _, _, size_bytes = self.entries.pop(conversation_id)
+        self.size_bytes -= size_bytes
+
+    def record(self, hit: bool):
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def stats(self) -> Dict:
+        requests = self.hits + self.misses
+        return {
+            "conversations": len(self.entries),
+            "max_entries": self.max_entries,
+            "size_mb": round(self.size_bytes / (1024 * 1024), 3),
+            "max_mb": round(self.max_bytes / (1024 * 1024), 3),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / requests if requests else 0.0,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,56 @@
+"""
+Per-request deadlines shared by every stage of the agent workflow
+"""
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Optional
+from agentic.utils.get_env import get_env
+
+# Blocking model calls run here so a stuck call can be abandoned at the deadline
+_executor = ThreadPoolExecutor(
+    max_workers=int(get_env("DEADLINE_WORKERS", "16")),
+    thread_name_prefix="deadline"
+)
+
+
+class DeadlineExceeded(Exception):
+    def __init__(self, stage: str):
+        super().__init__(f"Deadline exceeded during {stage}")
+        self.stage = stage
+
+
+class Deadline:
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def timeout_for(self, stage_budget: Optional[float] = None) -> float:
+        """Time a stage may take: its own budget, capped by what is left of the request"""
+        if stage_budget is None:
+            return self.remaining()
+        return min(stage_budget, self.remaining())
+
+
+def run_with_deadline(fn: Callable[..., Any], deadline: Optional[Deadline], stage: str, *args, stage_budget: Optional[float] = None, **kwargs) -> Any:
+    """Run a blocking call, raising DeadlineExceeded if it outlives the stage timeout"""
+    if deadline is None:
+        return fn(*args, **kwargs)
+
+    timeout = deadline.timeout_for(stage_budget)
+    if timeout <= 0:
+        raise DeadlineExceeded(stage)
+
+    context = contextvars.copy_context()
+    future = _executor.submit(context.run, fn, *args, **kwargs)
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        future.cancel()
+        raise DeadlineExceeded(stage)
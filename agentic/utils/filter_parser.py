@@ -0,0 +1,73 @@
+"""
+Rule-based filter extraction used when the LLM planner is unavailable
+"""
+import re
+from typing import Dict, Any, Iterable, List, Optional
+
+# (currency sign, number, unit); a number is only a price with a $, a k suffix or a currency word,
+# so "from 2020" or "over 2 years old" are not price filters
+PRICE = r"(\$\s*)?(\d+(?:[.,]\d+)?)\s*(k\b|\$|(?:dollars?|usd|bucks)\b)?"
+BETWEEN_PATTERN = re.compile(rf"between\s+{PRICE}\s+(?:and|to|-)\s+{PRICE}")
+RANGE_PATTERN = re.compile(rf"(?=\$){PRICE}\s*(?:-|to)\s*{PRICE}")
+MAX_PATTERN = re.compile(rf"(?:under|below|less than|cheaper than|up to|at most|max(?:imum)?|<=?)\s+{PRICE}")
+MIN_PATTERN = re.compile(rf"(?:over|above|more than|at least|min(?:imum)?|from(?=\s+\$)|>=?)\s+{PRICE}")
+
+
+def _amount(sign: Optional[str], number: str, unit: Optional[str]) -> float:
+    value = float(number.replace(",", ""))
+    return value * 1000 if unit == "k" else value
+
+
+def _find_price(pattern: "re.Pattern", text: str) -> Optional["re.Match"]:
+    """First match where at least one amount is marked as a price (a range needs only one: "$50-100")"""
+    for match in pattern.finditer(text):
+        groups = match.groups()
+        if any(groups[i] or groups[i + 2] for i in range(0, len(groups), 3)):
+            return match
+    return None
+
+
+def _find_term(text: str, vocabulary: List[str]) -> str:
+    """Longest vocabulary entry appearing in the text as whole words"""
+    for term in vocabulary:
+        if re.search(rf"\b{re.escape(term.lower())}s?\b", text):
+            return term
+    return ""
+
+
+class FilterParser:
+    def __init__(self, brands: Iterable[str] = (), categories: Iterable[str] = ()):
+        self.brands: List[str] = []
+        self.categories: List[str] = []
+        self.load_vocabulary(brands, categories)
+
+    def load_vocabulary(self, brands: Iterable[str], categories: Iterable[str]):
+        """Known brand/category names; longest first so "New Balance" wins over "Balance" """
+        self.brands = sorted({b for b in brands if b}, key=len, reverse=True)
+        self.categories = sorted({c for c in categories if c}, key=len, reverse=True)
+
+    def parse(self, query: str) -> Dict[str, Any]:
+        """Extract the same filter keys the planner produces, omitting anything not found"""
+        text = query.lower()
+        filters: Dict[str, Any] = {}
+
+        match = _find_price(BETWEEN_PATTERN, text) or _find_price(RANGE_PATTERN, text)
+        if match:
+            low, high = _amount(*match.group(1, 2, 3)), _amount(*match.group(4, 5, 6))
+            filters["min_price"], filters["max_price"] = min(low, high), max(low, high)
+        else:
+            match = _find_price(MAX_PATTERN, text)
+            if match:
+                filters["max_price"] = _amount(*match.group(1, 2, 3))
+            match = _find_price(MIN_PATTERN, text)
+            if match:
+                filters["min_price"] = _amount(*match.group(1, 2, 3))
+
+        brand = _find_term(text, self.brands)
+        if brand:
+            filters["brand"] = brand
+        category = _find_term(text, self.categories)
+        if category:
+            filters["category"] = category
+
+        return filters
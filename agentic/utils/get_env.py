@@ -1,7 +1,9 @@
 import os
+from pathlib import Path
 from dotenv import load_dotenv
 
-load_dotenv(dotenv_path='../../.env')
+# Repository root .env, independent of the working directory
+load_dotenv(dotenv_path=Path(__file__).resolve().parents[2] / '.env')
 
-def get_env(env: str):
-    return os.environ.get(env, "")
+def get_env(env: str, default: str = ""):
+    return os.environ.get(env, default)
@@ -0,0 +1,91 @@
+"""
+Deterministic renderer for plain product listings
+
+Builds the ProductFinder 3-part response (acknowledgment, Top Pick / Best Value /
+Premium Option, follow-up offer) directly from search result rows, so simple
+listings and deadline fallbacks do not need a generation call.
+"""
+import re
+from typing import List, Dict, Any, Optional
+
+SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+")
+
+FOLLOW_UP = "Would you like more details about any of these options, or should I search in a different price range or category?"
+
+
+def _price(product: Dict[str, Any]) -> str:
+    return f"${product['price']:.2f}" if product.get("price") is not None else "Price not listed"
+
+
+def _first_sentence(text: Optional[str]) -> str:
+    if not text:
+        return ""
+    return SENTENCE_PATTERN.split(" ".join(text.split()))[0]
+
+
+class ListingRenderer:
+    def pick(self, products: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Top pick by similarity, best value by lowest price, premium by highest price"""
+        if not products:
+            return {}
+
+        top = max(products, key=lambda p: p.get("similarity_score") or 0) if any(
+            p.get("similarity_score") is not None for p in products
+        ) else products[0]
+        picks = {"top": top}
+
+        priced = [p for p in products if p.get("price") is not None and p is not top]
+        if priced:
+            picks["value"] = min(priced, key=lambda p: p["price"])
+            premium = [p for p in priced if p is not picks["value"]]
+            if premium:
+                picks["premium"] = max(premium, key=lambda p: p["price"])
+        return picks
+
+    def render(self, query: str, products: List[Dict[str, Any]]) -> str:
+        if not products:
+            return (
+                f"I couldn't find any products matching \"{query}\".\n\n"
+                "Would you like me to broaden the search, try a different price range, or look in a related category?"
+            )
+
+        picks = self.pick(products)
+        top = picks["top"]
+        sections = [f"Here are the best matches I found for \"{query}\":"]
+
+        lines = [f"**🏆 Top Pick: {top['name']}**", f"- Price: {_price(top)}"]
+        if _first_sentence(top.get("description")):
+            lines.append(f"- Key Features: {_first_sentence(top.get('description'))}")
+        if top.get("usage"):
+            lines.append(f"- Best for: {_first_sentence(top['usage'])}")
+        sections.append("\n".join(lines))
+
+        value = picks.get("value")
+        if value:
+            reason = "Lowest price among the matches"
+            if top.get("price") is not None and value["price"] < top["price"]:
+                reason += f", ${top['price'] - value['price']:.2f} less than the top pick"
+            elif top.get("price") is not None:
+                reason = "Lowest price among the alternatives to the top pick"
+            sections.append("\n".join([
+                f"**💰 Best Value: {value['name']}**",
+                f"- Price: {_price(value)}",
+                f"- Why it's great value: {reason}",
+            ]))
+
+        premium = picks.get("premium")
+        if premium:
+            lines = [f"**⭐ Premium Option: {premium['name']}**", f"- Price: {_price(premium)}"]
+            if _first_sentence(premium.get("description")):
+                lines.append(f"- Premium benefits: {_first_sentence(premium.get('description'))}")
+            sections.append("\n".join(lines))
+
+        shown = {id(p) for p in picks.values()}
+        others = [p for p in products if id(p) not in shown]
+        if others:
+            sections.append("Other matches:\n" + "\n".join(
+                f"- {p['name']} by {p.get('brand') or 'Unknown brand'} ({_price(p)})" for p in others
+            ))
+
+        sections.append(FOLLOW_UP)
+        return "\n\n".join(sections)
@@ -0,0 +1,35 @@
+"""
+Prometheus metrics shared by the agent and the API
+"""
+from prometheus_client import Counter, Gauge, Histogram
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ["route", "method", "status"],
+    buckets=LATENCY_BUCKETS
+)
+SPAN_SECONDS = Histogram(
+    "agent_span_duration_seconds", "Latency of agent graph nodes, model calls and SQL statements", ["span"],
+    buckets=LATENCY_BUCKETS
+)
+LLM_TOKENS = Counter(
+    "agent_llm_tokens_total", "LLM tokens by call and kind (prompt, completion, think)", ["call", "kind"]
+)
+SEARCH_RESULT_TOKENS = Histogram(
+    "agent_search_result_tokens", "Tokens of serialized search results sent to generation",
+    buckets=(50, 100, 200, 400, 600, 800, 1200, 2000)
+)
+ROUTE_STRATEGY = Counter("agent_route_strategy_total", "Requests by planned search strategy", ["strategy"])
+SERVED_BY = Counter("agent_served_by_total", "Responses by serving path", ["served_by"])
+STAGE_TIMEOUTS = Counter("agent_stage_timeouts_total", "Stages that hit the request deadline", ["stage"])
+QUERY_CACHE_REQUESTS = Counter("query_cache_requests_total", "Query embedding and search result cache lookups", ["cache", "result"])
+STARTUP_SECONDS = Gauge("startup_step_seconds", "Duration of each API startup and warm-up step", ["step"])
+
+ADMISSION_QUEUE_DEPTH = Gauge("admission_queue_depth", "Requests waiting for a model slot", ["model", "lane"])
+ADMISSION_RUNNING = Gauge("admission_running", "Requests holding a model slot", ["model"])
+ADMISSION_WAIT_SECONDS = Histogram(
+    "admission_wait_seconds", "Time spent waiting for a model slot", ["model"],
+    buckets=LATENCY_BUCKETS
+)
+ADMISSION_REJECTED = Counter("admission_rejected_total", "Rejected requests by reason", ["model", "reason"])
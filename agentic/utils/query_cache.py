@@ -0,0 +1,102 @@
+"""
+LRU caches keyed by query text
+
+Popular queries repeat verbatim (or differ only in case and spacing), and both
+an embedding call and a search cost a round trip, so query embeddings and
+search results are kept in memory. Entries written by the pre-warm job are
+flagged so the hit rate they achieve can be reported separately.
+"""
+import contextvars
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Optional, Tuple
+from agentic.utils.metrics import QUERY_CACHE_REQUESTS
+
+# Set while the pre-warm job runs, so its own lookups don't count as hits or misses
+_uncounted = contextvars.ContextVar("query_cache_uncounted", default=False)
+
+
+@contextmanager
+def uncounted():
+    """Leave cache hit/miss stats and metrics alone for lookups made inside the block"""
+    token = _uncounted.set(True)
+    try:
+        yield
+    finally:
+        _uncounted.reset(token)
+
+
+def normalize_query(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+class QueryCache:
+    def __init__(self, name: str, max_entries: int = 1024, ttl_seconds: Optional[float] = None):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # key -> (value, stored_at, prewarmed)
+        self.entries: "OrderedDict[str, Tuple[Any, float, bool]]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.prewarmed_hits = 0
+
+    def _expired(self, stored_at: float) -> bool:
+        return self.ttl_seconds is not None and time.monotonic() - stored_at > self.ttl_seconds
+
+    def get(self, text: str) -> Optional[Any]:
+        key = normalize_query(text)
+        result = "miss"
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and self._expired(entry[1]):
+                del self.entries[key]
+                entry = None
+            if _uncounted.get():
+                return entry[0] if entry is not None else None
+            if entry is None:
+                self.misses += 1
+            else:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                result = "hit"
+                if entry[2]:
+                    self.prewarmed_hits += 1
+                    result = "prewarmed_hit"
+        QUERY_CACHE_REQUESTS.labels(self.name, result).inc()
+        return entry[0] if entry is not None else None
+
+    def put(self, text: str, value: Any, prewarmed: bool = False):
+        if self.max_entries <= 0:
+            return
+        key = normalize_query(text)
+        with self.lock:
+            self.entries[key] = (value, time.monotonic(), prewarmed)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def __contains__(self, text: str) -> bool:
+        entry = self.entries.get(normalize_query(text))
+        return entry is not None and not self._expired(entry[1])
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self) -> Dict:
+        requests = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "prewarmed_entries": sum(1 for entry in self.entries.values() if entry[2]),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "prewarmed_hits": self.prewarmed_hits,
+            "hit_rate": self.hits / requests if requests else 0.0,
+            # Share of all lookups answered by an entry the pre-warm job wrote
+            "prewarmed_hit_rate": self.prewarmed_hits / requests if requests else 0.0,
+        }
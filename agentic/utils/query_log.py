@@ -0,0 +1,129 @@
+"""
+Append-only JSONL log of the queries users send
+
+Requests only enqueue an entry; a background thread writes them to
+QUERY_LOG_PATH, so logging never adds disk I/O to a request. Once the file
+reaches QUERY_LOG_MAX_MB it is rotated to QUERY_LOG_PATH.1, replacing the
+previous one, so at most twice that is kept. The log is mined for popular
+queries to pre-warm the embedding and search result caches.
+"""
+import json
+import os
+import queue
+import threading
+from collections import Counter, deque
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from agentic.utils.get_env import get_env
+
+DEFAULT_PATH = Path(__file__).resolve().parents[2] / "logs" / "queries.jsonl"
+
+_STOP = object()
+
+
+class QueryLog:
+    def __init__(self, path: Optional[str] = None, max_pending: int = 10000, max_mb: Optional[float] = None):
+        # An empty path disables logging
+        self.path = get_env("QUERY_LOG_PATH", str(DEFAULT_PATH)) if path is None else path
+        self.max_bytes = int((max_mb if max_mb is not None else float(get_env("QUERY_LOG_MAX_MB", "32"))) * 1024 * 1024)
+        self.pending: "queue.Queue" = queue.Queue(maxsize=max_pending)
+        self.dropped = 0
+        self.written = 0
+        self.rotations = 0
+        self.writer: Optional[threading.Thread] = None
+        self.lock = threading.Lock()
+
+    def record(self, entry: Dict[str, Any]):
+        """Queue an entry for writing; drops it rather than blocking if the writer falls behind"""
+        if not self.path:
+            return
+        self._start()
+        try:
+            self.pending.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self):
+        if self.writer is not None:
+            return
+        with self.lock:
+            if self.writer is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self.writer = threading.Thread(target=self._write, name="query-log", daemon=True)
+                self.writer.start()
+
+    def _write(self):
+        f = open(self.path, "a")
+        try:
+            while True:
+                entries = [self.pending.get()]
+                # Write everything queued so far in one go
+                while True:
+                    try:
+                        entries.append(self.pending.get_nowait())
+                    except queue.Empty:
+                        break
+                stop = any(entry is _STOP for entry in entries)
+                lines = [json.dumps(entry) for entry in entries if entry is not _STOP]
+                if lines:
+                    f.write("\n".join(lines) + "\n")
+                    f.flush()
+                    self.written += len(lines)
+                    if self.max_bytes > 0 and f.tell() >= self.max_bytes:
+                        f = self._rotate(f)
+                if stop:
+                    return
+        finally:
+            f.close()
+
+    def _rotate(self, f):
+        """Move the full log to <path>.1 and continue in a new file"""
+        f.close()
+        os.replace(self.path, f"{self.path}.1")
+        self.rotations += 1
+        return open(self.path, "a")
+
+    def close(self, timeout: float = 5.0):
+        """Flush queued entries and stop the writer"""
+        if self.writer is None:
+            return
+        self.pending.put(_STOP)
+        self.writer.join(timeout)
+        self.writer = None
+
+
+def popular_queries(path: str, top_n: int = 100, max_lines: int = 100000) -> List[Dict[str, Any]]:
+    """Most frequent queries in the last `max_lines` log entries, with their latest strategy and filters"""
+    if not path:
+        return []
+    lines: deque = deque(maxlen=max_lines)
+    # The rotated file holds the older entries
+    for name in (f"{path}.1", path):
+        if os.path.exists(name):
+            with open(name) as f:
+                lines.extend(f)
+
+    counts: Counter = Counter()
+    latest: Dict[str, Dict[str, Any]] = {}
+    for line in lines:
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        query = entry.get("query")
+        if not query:
+            continue
+        counts[query] += 1
+        latest[query] = entry
+
+    return [
+        {
+            "query": query,
+            "count": count,
+            "strategy": latest[query].get("strategy") or "semantic",
+            "filters": latest[query].get("filters") or {},
+        }
+        for query, count in counts.most_common(top_n)
+    ]
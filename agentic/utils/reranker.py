@@ -0,0 +1,98 @@
+"""
+Maximal marginal relevance re-ranking of semantic search candidates
+
+The nearest neighbours of a query are often near-duplicates (one product line
+in several colours, one brand's whole range), which spends prompt tokens on
+redundant items and gives the model nothing to compare. Search over-fetches
+candidates together with their pairwise embedding similarities; MMR then picks
+the final k one at a time, trading relevance to the query against similarity
+to the items already picked, with at most RERANK_BRAND_CAP items per brand and
+a penalty for repeating a price band.
+"""
+from typing import Any, Dict, List, Optional
+import numpy as np
+from agentic.utils.get_env import get_env
+
+PAIRWISE_KEY = "pairwise_similarities"
+
+
+def strip(product: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of the product without its pairwise similarities"""
+    return {key: value for key, value in product.items() if key != PAIRWISE_KEY}
+
+
+class MMRReranker:
+    def __init__(
+        self,
+        diversity: Optional[float] = None,
+        brand_cap: Optional[int] = None,
+        price_bands: Optional[int] = None,
+        price_band_penalty: Optional[float] = None
+    ):
+        # 0 ranks by relevance alone, 1 by novelty alone
+        self.diversity = diversity if diversity is not None else float(get_env("RERANK_DIVERSITY", "0.3"))
+        self.brand_cap = brand_cap or int(get_env("RERANK_BRAND_CAP", "2"))
+        self.price_bands = price_bands or int(get_env("RERANK_PRICE_BANDS", "3"))
+        self.price_band_penalty = price_band_penalty if price_band_penalty is not None else float(get_env("RERANK_PRICE_BAND_PENALTY", "0.05"))
+
+    def _similarities(self, products: List[Dict[str, Any]]) -> np.ndarray:
+        """Candidate-by-candidate similarity matrix; zeros (relevance only) if search did not return it"""
+        n = len(products)
+        rows = [product.get(PAIRWISE_KEY) for product in products]
+        if any(row is None or len(row) != n for row in rows):
+            return np.zeros((n, n))
+        return np.asarray(rows, dtype=np.float64)
+
+    def _brand_codes(self, products: List[Dict[str, Any]]) -> np.ndarray:
+        """Integer code per brand, case-insensitive; products without a brand get 0, which is never capped"""
+        codes: Dict[str, int] = {}
+        return np.array([
+            codes.setdefault(product["brand"].lower(), len(codes) + 1) if product.get("brand") else 0
+            for product in products
+        ])
+
+    def _price_bands(self, products: List[Dict[str, Any]]) -> np.ndarray:
+        """Price quantile band of each candidate, 1..price_bands; 0 for products without a price"""
+        prices = np.array([product.get("price") or np.nan for product in products], dtype=np.float64)
+        known = np.flatnonzero(np.isfinite(prices))
+        bands = np.zeros(len(products), dtype=int)
+        ranks = np.argsort(np.argsort(prices[known], kind="stable"), kind="stable")
+        bands[known] = ranks * self.price_bands // max(len(known), 1) + 1
+        return bands
+
+    def rerank(self, products: List[Dict[str, Any]], k: int) -> List[Dict[str, Any]]:
+        """Pick k of the candidates in MMR order; the pairwise similarities are dropped from the result"""
+        if len(products) <= k:
+            return [strip(product) for product in products]
+        return self.rank(products, k)
+
+    def rank(self, products: List[Dict[str, Any]], k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """The first k candidates in MMR order, all of them by default; greedy, so any prefix is the rerank of that size"""
+        n = len(products)
+        k = n if k is None else min(k, n)
+        relevance = np.array([product.get("similarity_score") or 0.0 for product in products])
+        similarities = self._similarities(products)
+        brands = self._brand_codes(products)
+        bands = self._price_bands(products)
+
+        brand_counts = np.zeros(n + 1, dtype=int)
+        band_counts = np.zeros(self.price_bands + 1, dtype=int)
+        selected = np.zeros(n, dtype=bool)
+        redundancy = np.zeros(n)
+        order = []
+        for _ in range(k):
+            score = (1 - self.diversity) * relevance - self.diversity * redundancy - self.price_band_penalty * band_counts[bands]
+            blocked = selected | (brand_counts[brands] >= self.brand_cap)
+            if blocked.all():
+                # Every brand left is at its cap: relax the cap rather than return fewer than k
+                blocked = selected
+            score[blocked] = -np.inf
+            pick = int(np.argmax(score))
+            order.append(pick)
+            selected[pick] = True
+            redundancy = np.maximum(redundancy, similarities[pick])
+            if brands[pick]:
+                brand_counts[brands[pick]] += 1
+            if bands[pick]:
+                band_counts[bands[pick]] += 1
+        return [strip(products[i]) for i in order]
@@ -0,0 +1,157 @@
+"""
+Compact, token-budgeted serialization of search results for the generation prompt
+"""
+import math
+import re
+from typing import List, Dict, Any, Optional
+from agentic.utils.get_env import get_env
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count (~4 characters per token for English text)"""
+    if not text:
+        return 0
+    return math.ceil(len(text) / 4)
+
+
+def _words(text: Optional[str]) -> List[str]:
+    return WORD_PATTERN.findall((text or "").lower())
+
+
+class SerializedResults:
+    def __init__(self, text: str, token_count: int, included: List[Dict[str, Any]], duplicates: int = 0, omitted: int = 0):
+        self.text = text
+        self.token_count = token_count
+        self.included = included
+        self.duplicates = duplicates
+        self.omitted = omitted
+
+
+class ResultSerializer:
+    def __init__(self, token_budget: Optional[int] = None, description_tokens: Optional[int] = None, similarity_threshold: float = 0.85):
+        self.token_budget = token_budget or int(get_env("RESULT_TOKEN_BUDGET", "600"))
+        self.description_tokens = description_tokens or int(get_env("RESULT_DESCRIPTION_TOKENS", "40"))
+        self.similarity_threshold = similarity_threshold
+
+    def _is_duplicate(self, product: Dict[str, Any], kept: List[Dict[str, Any]]) -> bool:
+        """Near-identical items share a brand, almost all name words and the same price"""
+        name_words = set(_words(product.get("name")))
+        brand = (product.get("brand") or "").lower()
+        price = product.get("price")
+        for other in kept:
+            if (other.get("brand") or "").lower() != brand:
+                continue
+            other_words = set(_words(other.get("name")))
+            union = name_words | other_words
+            if not union:
+                continue
+            if len(name_words & other_words) / len(union) < self.similarity_threshold:
+                continue
+            other_price = other.get("price")
+            if price is None or other_price is None:
+                if price == other_price:
+                    return True
+                continue
+            if abs(price - other_price) <= 0.02 * max(price, other_price):
+                return True
+        return False
+
+    def truncate_description(self, description: Optional[str], query: str) -> str:
+        """Keep the description sentences that best match the query, within the per-item budget"""
+        if not description:
+            return ""
+        description = " ".join(description.split())
+        if estimate_tokens(description) <= self.description_tokens:
+            return description
+
+        query_words = set(_words(query))
+        sentences = [s for s in SENTENCE_PATTERN.split(description) if s]
+        ranked = sorted(
+            range(len(sentences)),
+            key=lambda i: (-len(query_words & set(_words(sentences[i]))), i)
+        )
+
+        chosen = []
+        used = 0
+        for i in ranked:
+            cost = estimate_tokens(sentences[i])
+            if used + cost > self.description_tokens:
+                continue
+            chosen.append(i)
+            used += cost
+
+        if not chosen:
+            # Even the best sentence is too long: cut it at a word boundary
+            max_chars = self.description_tokens * 4
+            best = sentences[ranked[0]]
+            return best[:max_chars].rsplit(" ", 1)[0] + "…"
+
+        return " ".join(sentences[i] for i in sorted(chosen))
+
+    def render_product(self, index: int, product: Dict[str, Any], query: str, with_description: bool = True) -> str:
+        price = product.get("price")
+        fields = [
+            product.get("name") or "Unnamed product",
+            product.get("brand") or "-",
+            product.get("category") or "-",
+            f"${price:.2f}" if price is not None else "price n/a",
+        ]
+        if product.get("similarity_score") is not None:
+            fields.append(f"sim {product['similarity_score']:.2f}")
+
+        line = f"{index}. " + " | ".join(fields)
+        if with_description:
+            description = self.truncate_description(product.get("description"), query)
+            if description:
+                line += f"\n   {description}"
+        return line
+
+    def serialize(self, products: List[Dict[str, Any]], query: str = "", header: Optional[str] = None) -> SerializedResults:
+        """Render products as compact lines until the token budget is used up"""
+        unique = []
+        duplicates = 0
+        for product in products:
+            if self._is_duplicate(product, unique):
+                duplicates += 1
+                continue
+            unique.append(product)
+
+        header = header or f"Found {len(products)} products matching '{query}':"
+        lines = [header]
+        used = estimate_tokens(header)
+        included = []
+
+        for product in unique:
+            line = self.render_product(len(included) + 1, product, query)
+            cost = estimate_tokens(line)
+            if used + cost > self.token_budget:
+                # Retry without the description before giving up on this item
+                line = self.render_product(len(included) + 1, product, query, with_description=False)
+                cost = estimate_tokens(line)
+                if used + cost > self.token_budget:
+                    break
+            lines.append(line)
+            used += cost
+            included.append(product)
+
+        omitted = len(unique) - len(included)
+        notes = []
+        if duplicates:
+            notes.append(f"{duplicates} near-duplicate(s) merged")
+        if omitted:
+            notes.append(f"{omitted} more omitted")
+        if notes:
+            note = f"({', '.join(notes)})"
+            lines.append(note)
+
+        text = "\n".join(lines)
+        return SerializedResults(
+            text=text,
+            token_count=estimate_tokens(text),
+            included=included,
+            duplicates=duplicates,
+            omitted=omitted
+        )
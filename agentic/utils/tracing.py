@@ -0,0 +1,88 @@
+"""
+Lightweight per-request tracing
+
+A Trace lives in a context variable for the duration of OrchestratorAgent.chat.
+span() records how long a block took, both into the current trace (returned
+as a per-request breakdown) and into the Prometheus span histogram.
+"""
+import contextvars
+import re
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+from agentic.utils.metrics import SPAN_SECONDS, LLM_TOKENS
+from agentic.utils.result_serializer import estimate_tokens
+
+THINK_PATTERN = re.compile(r"<think>(.*?)</think>", re.DOTALL)
+
+_current_trace: contextvars.ContextVar[Optional["Trace"]] = contextvars.ContextVar("trace", default=None)
+
+
+class Trace:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+        self.tokens: Dict[str, Dict[str, int]] = {}
+
+    def add_span(self, name: str, started: float, duration: float):
+        self.spans.append({
+            "name": name,
+            "start_ms": round((started - self.started) * 1000, 2),
+            "duration_ms": round(duration * 1000, 2),
+        })
+
+    def add_tokens(self, call: str, kind: str, count: int):
+        self.tokens.setdefault(call, {})
+        self.tokens[call][kind] = self.tokens[call].get(kind, 0) + count
+
+    def breakdown(self) -> Dict[str, Any]:
+        return {
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 2),
+            "spans": sorted(self.spans, key=lambda span: span["start_ms"]),
+            "tokens": self.tokens,
+        }
+
+
+@contextmanager
+def trace():
+    """Start a new trace for the current request"""
+    current = Trace()
+    token = _current_trace.set(current)
+    try:
+        yield current
+    finally:
+        _current_trace.reset(token)
+
+
+@contextmanager
+def span(name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - started
+        SPAN_SECONDS.labels(name).observe(duration)
+        current = _current_trace.get()
+        if current is not None:
+            current.add_span(name, started, duration)
+
+
+def record_llm_usage(call: str, response) -> None:
+    """Count prompt, completion and think tokens of an LLM response"""
+    usage = getattr(response, "usage_metadata", None) or {}
+    reasoning = (getattr(response, "additional_kwargs", None) or {}).get("reasoning_content") or ""
+    if not reasoning and isinstance(response.content, str):
+        reasoning = " ".join(THINK_PATTERN.findall(response.content))
+
+    counts = {
+        "prompt": usage.get("input_tokens", 0),
+        "completion": usage.get("output_tokens", 0),
+        # Ollama counts thinking as completion tokens; this is the estimated share of it
+        "think": estimate_tokens(reasoning),
+    }
+    current = _current_trace.get()
+    for kind, count in counts.items():
+        if count:
+            LLM_TOKENS.labels(call, kind).inc(count)
+            if current is not None:
+                current.add_tokens(call, kind, count)
@@ -0,0 +1,143 @@
+"""
+Synthetic product catalog for offline benchmarks
+
+Products are composed from brand/category/adjective/feature/usage vocabularies.
+Every vocabulary word has a fixed random vector and a product's embedding is
+the normalized sum of its words' vectors, so catalogs of 10k-1M products can be
+embedded with a handful of NumPy operations, and FakeEmbeddings places queries
+that share words with a product close to it.
+"""
+import hashlib
+import re
+from typing import Dict, List, Optional
+import numpy as np
+
+CATEGORIES = {
+    "Running Shoes": ["Nike", "Adidas", "Asics", "New Balance", "Brooks", "Hoka"],
+    "Headphones": ["Sony", "Bose", "Apple", "Sennheiser", "JBL", "Beats"],
+    "Laptops": ["Apple", "Dell", "Lenovo", "HP", "Asus", "Acer"],
+    "Smartphones": ["Apple", "Samsung", "Google", "OnePlus", "Xiaomi", "Motorola"],
+    "Smartwatches": ["Apple", "Garmin", "Samsung", "Fitbit", "Amazfit", "Polar"],
+    "Keyboards": ["Logitech", "Keychron", "Razer", "Corsair", "Ducky", "Apple"],
+    "Backpacks": ["Osprey", "The North Face", "Patagonia", "Herschel", "Deuter", "Nike"],
+    "Cameras": ["Canon", "Nikon", "Sony", "Fujifilm", "Panasonic", "GoPro"],
+}
+BASE_PRICES = {
+    "Running Shoes": 120, "Headphones": 180, "Laptops": 1200, "Smartphones": 700,
+    "Smartwatches": 300, "Keyboards": 110, "Backpacks": 90, "Cameras": 900,
+}
+ADJECTIVES = ["comfortable", "lightweight", "wireless", "waterproof", "durable", "compact", "premium", "quiet", "fast", "ergonomic"]
+FEATURES = ["long battery life", "noise cancelling", "breathable mesh", "gps tracking", "fast charging", "cushioned sole", "backlit keys", "4k video", "water resistance", "sleek design"]
+USAGES = ["daily training", "trail running", "travel", "office work", "video editing", "gaming", "hiking", "commuting", "studio recording", "photography"]
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def words(text: str) -> List[str]:
+    return WORD_PATTERN.findall(text.lower())
+
+
+class Vocabulary:
+    """Fixed random unit vector per word; unknown words get a seeded vector on first use"""
+
+    def __init__(self, dimension: int, seed: int = 7):
+        self.dimension = dimension
+        self.seed = seed
+        self.vectors: Dict[str, np.ndarray] = {}
+
+    def vector(self, word: str) -> np.ndarray:
+        if word not in self.vectors:
+            word_seed = int.from_bytes(hashlib.md5(word.encode()).digest()[:4], "little")
+            rng = np.random.default_rng([self.seed, word_seed])
+            vector = rng.standard_normal(self.dimension).astype(np.float32)
+            self.vectors[word] = vector / np.linalg.norm(vector)
+        return self.vectors[word]
+
+    def embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for word in words(text):
+            vector += self.vector(word)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def phrase_matrix(self, phrases: List[str]) -> np.ndarray:
+        """One summed (unnormalized) vector per phrase"""
+        matrix = np.zeros((len(phrases), self.dimension), dtype=np.float32)
+        for i, phrase in enumerate(phrases):
+            for word in words(phrase):
+                matrix[i] += self.vector(word)
+        return matrix
+
+
+class SyntheticCatalog:
+    def __init__(self, size: int, dimension: int = 128, seed: int = 7):
+        self.size = size
+        self.dimension = dimension
+        self.vocabulary = Vocabulary(dimension, seed)
+        rng = np.random.default_rng(seed)
+
+        self.category_names = list(CATEGORIES)
+        self.brand_names = sorted({brand for brands in CATEGORIES.values() for brand in brands})
+        brand_index = {brand: i for i, brand in enumerate(self.brand_names)}
+
+        self.category_codes = rng.integers(0, len(self.category_names), size)
+        # Each category draws from its own brands
+        brand_choice = rng.integers(0, 6, size)
+        category_brands = np.array([[brand_index[b] for b in CATEGORIES[c]] for c in self.category_names])
+        self.brand_codes = category_brands[self.category_codes, brand_choice]
+        self.adjective_codes = rng.integers(0, len(ADJECTIVES), size)
+        self.feature_codes = rng.integers(0, len(FEATURES), size)
+        self.usage_codes = rng.integers(0, len(USAGES), size)
+        self.model_numbers = rng.integers(1, 1000, size)
+
+        base = np.array([BASE_PRICES[c] for c in self.category_names], dtype=np.float64)[self.category_codes]
+        self.prices = np.round(base * rng.lognormal(0.0, 0.45, size), 2)
+        self.ids = np.arange(1, size + 1)
+
+        self.embeddings = self._embed()
+
+    def _embed(self) -> np.ndarray:
+        """Sum the vectors of each product's brand, category, adjective, feature and usage words"""
+        vocabulary = self.vocabulary
+        embeddings = vocabulary.phrase_matrix(self.brand_names)[self.brand_codes]
+        embeddings += vocabulary.phrase_matrix(self.category_names)[self.category_codes]
+        embeddings += vocabulary.phrase_matrix(ADJECTIVES)[self.adjective_codes]
+        embeddings += vocabulary.phrase_matrix(FEATURES)[self.feature_codes]
+        embeddings += vocabulary.phrase_matrix(USAGES)[self.usage_codes]
+        embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings
+
+    def product(self, index: int) -> Dict:
+        """Materialize one row in the shape returned by the search tools"""
+        category = self.category_names[self.category_codes[index]]
+        brand = self.brand_names[self.brand_codes[index]]
+        adjective = ADJECTIVES[self.adjective_codes[index]]
+        feature = FEATURES[self.feature_codes[index]]
+        usage = USAGES[self.usage_codes[index]]
+        return {
+            "id": int(self.ids[index]),
+            "name": f"{brand} {adjective.title()} {category[:-1] if category.endswith('s') else category} {self.model_numbers[index]}",
+            "brand": brand,
+            "category": category,
+            "description": f"A {adjective} {category.lower()} with {feature}. Built by {brand} for everyday reliability.",
+            "usage": f"Ideal for {usage}.",
+            "price": float(self.prices[index]),
+            "image_url": None,
+        }
+
+    def query_corpus(self, count: int, seed: Optional[int] = None) -> List[str]:
+        """Mix of semantic, structured and hybrid queries over the catalog vocabulary"""
+        rng = np.random.default_rng(self.vocabulary.seed if seed is None else seed)
+        queries = []
+        for i in range(count):
+            category = self.category_names[rng.integers(len(self.category_names))]
+            brand = CATEGORIES[category][rng.integers(6)]
+            price = int(BASE_PRICES[category] * rng.uniform(0.6, 1.5))
+            kind = i % 3
+            if kind == 0:
+                queries.append(f"I need {ADJECTIVES[rng.integers(len(ADJECTIVES))]} {category.lower()} for {USAGES[rng.integers(len(USAGES))]}")
+            elif kind == 1:
+                queries.append(f"Show me {brand} {category.lower()} under ${price}")
+            else:
+                queries.append(f"{ADJECTIVES[rng.integers(len(ADJECTIVES))]} {brand} {category.lower()} with {FEATURES[rng.integers(len(FEATURES))]} under ${price}")
+        return queries
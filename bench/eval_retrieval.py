@@ -0,0 +1,311 @@
+"""
+Retrieval quality and latency of search configurations
+
+Runs a labeled query set through SemanticSearchTool.search_products (and, for
+queries with filters, StructuredFilterTool.filter_products) under several
+configurations: top_k, vector index parameters and embedding model. For each,
+reports recall@k, nDCG@k and MRR against the labels, recall against exact
+brute-force search with the same embedding ("exact_recall", how much the index
+loses), and embedding and search latency.
+
+Backends:
+    postgres  the real tools against DATABASE_URL; exact search disables index scans
+    local     the bench/ in-memory tools over a synthetic catalog with generated labels
+
+Usage:
+    python -m bench.eval_retrieval --backend local --catalog-size 100000
+    python -m bench.eval_retrieval --queries bench/queries.sample.json --configs configs.json
+
+A config file is a JSON list such as:
+    [{"name": "ef80", "top_k": 5, "settings": {"hnsw.ef_search": 80}},
+     {"name": "nomic", "embedding": {"model": "nomic-embed-text"}}]
+Local configs use {"embedding": {"dimension": 64}} and {"index": {"lists": 100}}.
+"""
+import argparse
+import json
+import math
+import os
+import statistics
+import time
+from typing import Any, Dict, List, Optional
+import numpy as np
+from agentic.utils.get_env import get_env
+
+# The tools import the database module, which needs a URL even for the local backend
+os.environ.setdefault("DATABASE_URL", get_env("DATABASE_URL") or "sqlite://")
+
+from langchain_core.embeddings import Embeddings
+from langchain_ollama import OllamaEmbeddings
+from agentic.factory.embedding import EmbeddingModel
+from agentic.tools.semantic_search import SemanticSearchTool
+from agentic.tools.structured_filter import StructuredFilterTool
+from bench.catalog import ADJECTIVES, USAGES, SyntheticCatalog
+from bench.fakes import FakeEmbeddings
+from bench.local_store import IvfIndex, LocalSemanticSearchTool, LocalStructuredFilterTool
+
+EXACT_SETTINGS = {"enable_indexscan": "off", "enable_bitmapscan": "off"}
+
+POSTGRES_CONFIGS = [
+    {"name": "default"},
+    {"name": "top_k=10", "top_k": 10},
+]
+LOCAL_CONFIGS = [
+    {"name": "exact"},
+    {"name": "ivf probes=1", "index": {"lists": 100}, "settings": {"ivfflat.probes": 1}},
+    {"name": "ivf probes=4", "index": {"lists": 100}, "settings": {"ivfflat.probes": 4}},
+    {"name": "ivf probes=16", "index": {"lists": 100}, "settings": {"ivfflat.probes": 16}},
+    {"name": "top_k=10", "top_k": 10},
+    {"name": "dim=64", "embedding": {"dimension": 64}},
+]
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeds each query once, so search latency can be timed apart from the model call"""
+
+    def __init__(self, embedding: Embeddings):
+        self.embedding = embedding
+        self.cache: Dict[str, List[float]] = {}
+
+    def embed_query(self, text: str) -> List[float]:
+        if text not in self.cache:
+            self.cache[text] = self.embedding.embed_query(text)
+        return self.cache[text]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_query(text) for text in texts]
+
+
+def load_queries(path: str) -> List[Dict[str, Any]]:
+    """Labeled queries: {"query", "relevant": {product_id: grade} or [product_id, ...], "filters"?}"""
+    with open(path) as f:
+        entries = json.load(f)["queries"]
+    for entry in entries:
+        relevant = entry["relevant"]
+        if isinstance(relevant, list):
+            relevant = {product_id: 1 for product_id in relevant}
+        entry["relevant"] = {int(product_id): float(grade) for product_id, grade in relevant.items()}
+        entry.setdefault("filters", {})
+    return entries
+
+
+def score(retrieved: List[int], relevant: Dict[int, float], k: int) -> Dict[str, float]:
+    """recall@k, nDCG@k (graded) and reciprocal rank of the first relevant result"""
+    retrieved = retrieved[:k]
+    hits = [product_id for product_id in retrieved if product_id in relevant]
+    dcg = sum(relevant.get(product_id, 0.0) / math.log2(rank + 2) for rank, product_id in enumerate(retrieved))
+    ideal = sum(grade / math.log2(rank + 2) for rank, grade in enumerate(sorted(relevant.values(), reverse=True)[:k]))
+    first = next((rank for rank, product_id in enumerate(retrieved) if product_id in relevant), None)
+    return {
+        "recall": len(hits) / len(relevant) if relevant else 0.0,
+        "ndcg": dcg / ideal if ideal else 0.0,
+        "mrr": 1.0 / (first + 1) if first is not None else 0.0,
+    }
+
+
+def summarize(name: str, tool: str, top_k: int, scores: List[Dict[str, float]], embed_ms: List[float], search_ms: List[float]) -> Dict[str, Any]:
+    ordered = sorted(search_ms)
+    row = {"name": name, "tool": tool, "top_k": top_k, "queries": len(scores)}
+    for metric in ("recall", "ndcg", "mrr", "exact_recall"):
+        values = [entry[metric] for entry in scores if metric in entry]
+        if values:
+            row[metric] = round(statistics.mean(values), 4)
+    row["embed_p50_ms"] = round(statistics.median(embed_ms), 2) if embed_ms else 0.0
+    row["search_p50_ms"] = round(ordered[len(ordered) // 2], 2) if ordered else 0.0
+    row["search_p95_ms"] = round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 2) if ordered else 0.0
+    return row
+
+
+class Backend:
+    """Builds the search tools a config describes"""
+
+    def semantic(self, config: Dict[str, Any]):
+        raise NotImplementedError
+
+    def exact(self, config: Dict[str, Any]):
+        """The same embedding as `config`, searched by brute force"""
+        raise NotImplementedError
+
+    def structured(self):
+        raise NotImplementedError
+
+
+class PostgresBackend(Backend):
+    def __init__(self):
+        factory = EmbeddingModel()
+        self.default_model = factory.name
+        self.embeddings: Dict[Optional[str], CachedEmbeddings] = {None: CachedEmbeddings(factory.embedding)}
+        self.structured_filter = StructuredFilterTool()
+
+    def _embedding(self, config: Dict[str, Any]) -> CachedEmbeddings:
+        # Only meaningful if the active embedding set holds vectors from the same model
+        model = config.get("embedding", {}).get("model")
+        if model not in self.embeddings:
+            self.embeddings[model] = CachedEmbeddings(OllamaEmbeddings(model=model))
+        return self.embeddings[model]
+
+    def semantic(self, config: Dict[str, Any]):
+        model = config.get("embedding", {}).get("model")
+        # The tool refuses models other than the active embedding set's
+        tool = SemanticSearchTool(embedding=self._embedding(config), embedding_model=f"ollama:{model}" if model else self.default_model)
+        if "settings" in config:
+            tool.search_settings = config["settings"]
+        return tool
+
+    def exact(self, config: Dict[str, Any]):
+        return self.semantic({**config, "settings": EXACT_SETTINGS})
+
+    def structured(self):
+        return self.structured_filter
+
+
+class LocalBackend(Backend):
+    def __init__(self, catalog_size: int, seed: int = 7):
+        self.catalog_size = catalog_size
+        self.seed = seed
+        self.catalogs = {128: SyntheticCatalog(catalog_size, 128, seed)}
+        self.embeddings: Dict[int, CachedEmbeddings] = {}
+        self.indexes = {}
+        self.structured_filter = LocalStructuredFilterTool(self.catalogs[128])
+
+    def _catalog(self, config: Dict[str, Any]):
+        # Same seed, so the same products embedded at another dimension (a stand-in for another model)
+        dimension = config.get("embedding", {}).get("dimension", 128)
+        if dimension not in self.catalogs:
+            self.catalogs[dimension] = SyntheticCatalog(self.catalog_size, dimension, self.seed)
+        return self.catalogs[dimension]
+
+    def _tool(self, config: Dict[str, Any], index_options: Optional[Dict[str, Any]]):
+        catalog = self._catalog(config)
+        if catalog.dimension not in self.embeddings:
+            self.embeddings[catalog.dimension] = CachedEmbeddings(FakeEmbeddings(catalog, latency_ms=0))
+        index = None
+        if index_options:
+            key = (catalog.dimension, index_options.get("lists", 100))
+            if key not in self.indexes:
+                self.indexes[key] = IvfIndex(catalog.embeddings, lists=key[1])
+            index = self.indexes[key]
+        tool = LocalSemanticSearchTool(catalog, self.embeddings[catalog.dimension], index=index)
+        tool.search_settings = config.get("settings", {})
+        return tool
+
+    def semantic(self, config: Dict[str, Any]):
+        return self._tool(config, config.get("index"))
+
+    def exact(self, config: Dict[str, Any]):
+        return self._tool(config, None)
+
+    def structured(self):
+        return self.structured_filter
+
+    def labeled_queries(self, count: int) -> List[Dict[str, Any]]:
+        """Queries built from a random product's words; relevant = same category, adjective and usage (+1 for brand)"""
+        catalog = self.catalogs[128]
+        rng = np.random.default_rng(self.seed + 1)
+        entries = []
+        for i in range(count):
+            index = rng.integers(catalog.size)
+            product = catalog.product(index)
+            adjective = ADJECTIVES[catalog.adjective_codes[index]]
+            usage = USAGES[catalog.usage_codes[index]]
+            base = (
+                (catalog.category_codes == catalog.category_codes[index])
+                & (catalog.adjective_codes == catalog.adjective_codes[index])
+                & (catalog.usage_codes == catalog.usage_codes[index])
+            )
+            grades = base.astype(float)
+            filters = {}
+            if i % 3 == 1:
+                query = f"{product['brand']} {adjective} {product['category'].lower()} for {usage}"
+                grades += base & (catalog.brand_codes == catalog.brand_codes[index])
+            elif i % 3 == 2:
+                query = f"{adjective} {product['category'].lower()} for {usage} under ${int(product['price'] * 1.2)}"
+                filters = {"category": product["category"], "max_price": int(product["price"] * 1.2)}
+                grades *= catalog.prices <= filters["max_price"]
+            else:
+                query = f"{adjective} {product['category'].lower()} for {usage}"
+            relevant = {int(catalog.ids[row]): float(grades[row]) for row in np.flatnonzero(grades)}
+            entries.append({"query": query, "relevant": relevant, "filters": filters})
+        return entries
+
+
+def evaluate_semantic(backend: Backend, config: Dict[str, Any], queries: List[Dict[str, Any]], default_top_k: int) -> Dict[str, Any]:
+    top_k = config.get("top_k", default_top_k)
+    tool, exact = backend.semantic(config), backend.exact(config)
+    scores, embed_ms, search_ms = [], [], []
+    for entry in queries:
+        started = time.perf_counter()
+        tool.get_embedding(entry["query"])
+        embed_ms.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        retrieved = [p["id"] for p in tool.search_products(entry["query"], top_k=top_k, filters=entry["filters"] or None)]
+        search_ms.append((time.perf_counter() - started) * 1000)
+
+        truth = [p["id"] for p in exact.search_products(entry["query"], top_k=top_k, filters=entry["filters"] or None)]
+        result = score(retrieved, entry["relevant"], top_k)
+        if truth:
+            result["exact_recall"] = len(set(retrieved) & set(truth)) / len(truth)
+        scores.append(result)
+    return summarize(config["name"], "semantic", top_k, scores, embed_ms, search_ms)
+
+
+def evaluate_structured(backend: Backend, queries: List[Dict[str, Any]], top_k: int) -> Optional[Dict[str, Any]]:
+    """filter_products on the labeled filters alone, ranked by id as in production"""
+    filtered = [entry for entry in queries if entry["filters"]]
+    if not filtered:
+        return None
+    tool = backend.structured()
+    scores, search_ms = [], []
+    for entry in filtered:
+        started = time.perf_counter()
+        retrieved = [p["id"] for p in tool.filter_products(**entry["filters"], limit=top_k)]
+        search_ms.append((time.perf_counter() - started) * 1000)
+        scores.append(score(retrieved, entry["relevant"], top_k))
+    return summarize("structured_filter", "structured", top_k, scores, [], search_ms)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backend", choices=("postgres", "local"), default="postgres")
+    parser.add_argument("--queries", help="labeled query set (required for postgres, generated for local)")
+    parser.add_argument("--configs", help="JSON list of configurations (defaults depend on the backend)")
+    parser.add_argument("--top-k", type=int, default=5, help="top_k for configs that don't set one")
+    parser.add_argument("--catalog-size", type=int, default=50_000, help="local backend catalog size")
+    parser.add_argument("--labeled-queries", type=int, default=150, help="generated queries for the local backend")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args()
+
+    if args.backend == "local":
+        backend = LocalBackend(args.catalog_size)
+        queries = load_queries(args.queries) if args.queries else backend.labeled_queries(args.labeled_queries)
+        configs = LOCAL_CONFIGS
+    else:
+        if not args.queries:
+            parser.error("--queries is required with the postgres backend")
+        backend = PostgresBackend()
+        queries = load_queries(args.queries)
+        configs = [{"name": "exact", "settings": EXACT_SETTINGS}] + POSTGRES_CONFIGS
+    if args.configs:
+        with open(args.configs) as f:
+            configs = json.load(f)
+
+    rows = [evaluate_semantic(backend, config, queries, args.top_k) for config in configs]
+    for top_k in sorted({row["top_k"] for row in rows}):
+        row = evaluate_structured(backend, queries, top_k)
+        if row:
+            rows.append(row)
+
+    print(f"{len(queries)} labeled queries, backend {args.backend}")
+    print(f"{'config':<20} {'tool':<10} {'k':>3} {'recall':>7} {'nDCG':>7} {'MRR':>7} {'exact':>7} {'embed':>8} {'p50':>8} {'p95':>8}")
+    for row in rows:
+        exact_recall = f"{row['exact_recall']:.3f}" if "exact_recall" in row else "-"
+        print(f"{row['name']:<20} {row['tool']:<10} {row['top_k']:>3} {row['recall']:>7.3f} {row['ndcg']:>7.3f} "
+              f"{row['mrr']:>7.3f} {exact_recall:>7} {row['embed_p50_ms']:>6.1f}ms {row['search_p50_ms']:>6.1f}ms {row['search_p95_ms']:>6.1f}ms")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"backend": args.backend, "queries": len(queries), "results": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
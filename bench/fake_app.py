@@ -0,0 +1,28 @@
+"""
+agentic.api.main:app wired to fake models and an in-memory synthetic catalog
+
+Serve it like the real app to load-test /chat without Ollama or Postgres:
+
+    uvicorn bench.fake_app:app --port 8010 --workers 4
+
+Each worker builds its own catalog. Latencies and catalog size come from
+BENCH_CATALOG_SIZE, BENCH_LLM_OVERHEAD_MS, BENCH_PREFILL_MS, BENCH_DECODE_MS
+and BENCH_EMBED_MS; queries are logged only if QUERY_LOG_PATH is set.
+"""
+import os
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from agentic.utils.get_env import get_env
+from bench.catalog import SyntheticCatalog
+from bench.run import api_app, build_agent
+
+catalog = SyntheticCatalog(int(get_env("BENCH_CATALOG_SIZE", "10000")))
+agent = build_agent(catalog, {
+    "llm_overhead_ms": float(get_env("BENCH_LLM_OVERHEAD_MS", "20")),
+    "prefill_ms": float(get_env("BENCH_PREFILL_MS", "0.2")),
+    "decode_ms": float(get_env("BENCH_DECODE_MS", "10")),
+    "embed_ms": float(get_env("BENCH_EMBED_MS", "15")),
+    "query_log_path": get_env("QUERY_LOG_PATH"),
+})
+app = api_app(agent)
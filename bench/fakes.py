@@ -0,0 +1,114 @@
+"""
+Deterministic stand-ins for ChatOllama and OllamaEmbeddings
+
+Latency is simulated from the same cost model as the Ollama stand-in server:
+a fixed per-call overhead, prefill time per prompt token and decode time per
+generated token. Responses are derived from the prompt, so planner output
+routes queries realistically and generation echoes the top results.
+"""
+import json
+import re
+import time
+from typing import Any, Callable, List, Optional
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from agentic.utils.filter_parser import FilterParser
+from agentic.utils.result_serializer import estimate_tokens
+from bench.catalog import SyntheticCatalog
+
+QUERY_PATTERN = re.compile(r'(?:User )?Query: "(.*)"')
+RESULT_LINE_PATTERN = re.compile(r"^\d+\. ([^|]+)\|", re.MULTILINE)
+LISTING_PATTERN = re.compile(r"^\s*(show|list|find|give|get)\b", re.IGNORECASE)
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model whose reply is computed by `responder` from the messages"""
+
+    model: str = "fake-qwen3:8b"
+    responder: Callable[[List[BaseMessage]], str]
+    call_overhead_ms: float = 20.0
+    prefill_ms_per_token: float = 0.2
+    decode_ms_per_token: float = 10.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        reply = self.responder(messages)
+        prompt_tokens = sum(estimate_tokens(str(m.content)) for m in messages)
+        completion_tokens = estimate_tokens(reply)
+        time.sleep((
+            self.call_overhead_ms
+            + prompt_tokens * self.prefill_ms_per_token
+            + completion_tokens * self.decode_ms_per_token
+        ) / 1000)
+        message = AIMessage(
+            content=reply,
+            usage_metadata={
+                "input_tokens": prompt_tokens,
+                "output_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+class FakeEmbeddings(Embeddings):
+    """Embeds text in the synthetic catalog's vector space"""
+
+    def __init__(self, catalog: SyntheticCatalog, latency_ms: float = 15.0):
+        self.catalog = catalog
+        self.latency_ms = latency_ms
+
+    def embed_query(self, text: str) -> List[float]:
+        time.sleep(self.latency_ms / 1000)
+        return self.catalog.vocabulary.embed(text).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_query(text) for text in texts]
+
+
+def _query(messages: List[BaseMessage]) -> str:
+    match = QUERY_PATTERN.search(str(messages[-1].content))
+    return match.group(1) if match else str(messages[-1].content)
+
+
+def planner_responder(catalog: SyntheticCatalog) -> Callable[[List[BaseMessage]], str]:
+    """Plan like a well-behaved model: filters from the query text, strategy from their presence"""
+    parser = FilterParser(catalog.brand_names, catalog.category_names)
+
+    def respond(messages: List[BaseMessage]) -> str:
+        query = _query(messages)
+        filters = parser.parse(query)
+        listing = bool(LISTING_PATTERN.match(query))
+        if not filters:
+            strategy = "semantic"
+        elif listing:
+            strategy = "structured"
+        else:
+            strategy = "both"
+        return json.dumps({"strategy": strategy, "filters": filters, "listing": listing})
+
+    return respond
+
+
+def generation_responder(messages: List[BaseMessage]) -> str:
+    """A ProductFinder-shaped answer naming the first results"""
+    names = [name.strip() for name in RESULT_LINE_PATTERN.findall(str(messages[-1].content))]
+    if not names:
+        return "I couldn't find matching products. Would you like me to broaden the search?"
+    lines = [f"I found some great options for \"{_query(messages)}\":", ""]
+    for label, name in zip(("🏆 Top Pick", "💰 Best Value", "⭐ Premium Option"), names):
+        lines.append(f"**{label}: {name}**")
+    lines += ["", "Would you like more details about any of these options?"]
+    return "\n".join(lines)
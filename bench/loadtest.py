@@ -0,0 +1,210 @@
+"""
+HTTP load generator for POST /chat
+
+Replays a query corpus (the README's example queries plus a synthetic mix of
+semantic, structured and hybrid queries) against a running server, either
+closed-loop at a fixed concurrency or open-loop at a target request rate, and
+reports latency percentiles, error rate and throughput. With --metrics it also
+scrapes /metrics before and after the run and reports the server's mean
+per-stage latency and admission rejections over the run.
+
+Usage:
+    uvicorn bench.fake_app:app --port 8010 --workers 4
+    python -m bench.loadtest --url http://localhost:8010 --concurrency 16 --duration 30
+    python -m bench.loadtest --url http://localhost:8010 --rps 20 --duration 30 --metrics
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import Dict, List, Optional
+from uuid import uuid4
+import httpx
+from prometheus_client.parser import text_string_to_metric_families
+from bench.catalog import SyntheticCatalog
+
+README_QUERIES = [
+    "I need comfortable running shoes",
+    "Show me Apple products under $500",
+    "What wireless headphones do you recommend?",
+    "Find Nike shoes for trail running",
+]
+
+
+def query_corpus(synthetic: int, seed: int = 7) -> List[str]:
+    """README examples followed by the synthetic semantic/structured/hybrid mix"""
+    return README_QUERIES + SyntheticCatalog(1, seed=seed).query_corpus(synthetic)
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+class LoadTest:
+    def __init__(self, url: str, queries: List[str], users: int, conversation_id: Optional[str] = None, user_id: Optional[str] = None, deadline_seconds: Optional[float] = None):
+        self.url = url.rstrip("/")
+        self.queries = queries
+        # Without a fixed user/conversation, every virtual user gets random ids (fine for bench.fake_app)
+        self.users = [user_id] if user_id else [str(uuid4()) for _ in range(users)]
+        self.conversation_id = conversation_id or str(uuid4())
+        self.deadline_seconds = deadline_seconds
+        self.sent = 0
+        self.latencies: List[float] = []
+        self.statuses: Dict[str, int] = {}
+        self.served_by: Dict[str, int] = {}
+
+    def _next(self) -> Dict:
+        index = self.sent
+        self.sent += 1
+        body = {
+            "message": self.queries[index % len(self.queries)],
+            "conversation_id": self.conversation_id,
+            "user_id": self.users[index % len(self.users)],
+        }
+        if self.deadline_seconds:
+            body["deadline_seconds"] = self.deadline_seconds
+        return body
+
+    async def _request(self, client: httpx.AsyncClient, body: Dict):
+        started = time.perf_counter()
+        try:
+            response = await client.post(f"{self.url}/chat", json=body)
+            status = str(response.status_code)
+            if response.status_code == 200:
+                served_by = response.json().get("served_by", "unknown")
+                self.served_by[served_by] = self.served_by.get(served_by, 0) + 1
+        except httpx.HTTPError as err:
+            status = type(err).__name__
+        self.latencies.append((time.perf_counter() - started) * 1000)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    async def closed_loop(self, client: httpx.AsyncClient, concurrency: int, until: float, limit: Optional[int]):
+        """`concurrency` workers each sending their next request as soon as the last one finishes"""
+        async def worker():
+            while time.monotonic() < until and (limit is None or self.sent < limit):
+                await self._request(client, self._next())
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    async def open_loop(self, client: httpx.AsyncClient, rps: float, until: float, limit: Optional[int]):
+        """Send at a fixed rate regardless of how fast the server answers"""
+        started = time.monotonic()
+        in_flight = set()
+        while time.monotonic() < until and (limit is None or self.sent < limit):
+            task = asyncio.create_task(self._request(client, self._next()))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+            # Schedule against the start time so slow sends don't lower the rate
+            await asyncio.sleep(max(0.0, started + self.sent / rps - time.monotonic()))
+        if in_flight:
+            await asyncio.gather(*in_flight)
+
+    def report(self, elapsed: float) -> Dict:
+        ordered = sorted(self.latencies)
+        completed = len(ordered)
+        errors = completed - self.statuses.get("200", 0)
+        return {
+            "requests": completed,
+            "elapsed_seconds": round(elapsed, 2),
+            "throughput_rps": round(self.statuses.get("200", 0) / elapsed, 2) if elapsed else 0.0,
+            "error_rate": round(errors / completed, 4) if completed else 0.0,
+            "status": self.statuses,
+            "served_by": self.served_by,
+            "latency_ms": {
+                "p50": round(percentile(ordered, 0.50), 1),
+                "p95": round(percentile(ordered, 0.95), 1),
+                "p99": round(percentile(ordered, 0.99), 1),
+                "max": round(ordered[-1], 1) if ordered else 0.0,
+            },
+        }
+
+
+def scrape(client: httpx.Client, url: str) -> Dict[str, float]:
+    """Flatten the /metrics samples this report uses into "name{labels}" -> value"""
+    samples = {}
+    text = client.get(f"{url.rstrip('/')}/metrics").text
+    for family in text_string_to_metric_families(text):
+        if family.name not in ("agent_span_duration_seconds", "admission_rejected", "agent_stage_timeouts"):
+            continue
+        for sample in family.samples:
+            labels = ",".join(f"{key}={value}" for key, value in sorted(sample.labels.items()) if key != "le")
+            if not sample.name.endswith(("_bucket", "_created")):
+                samples[f"{sample.name}{{{labels}}}"] = sample.value
+    return samples
+
+
+def server_stages(before: Dict[str, float], after: Dict[str, float]) -> Dict:
+    """Mean span latency and counter increases between two scrapes"""
+    delta = {key: value - before.get(key, 0.0) for key, value in after.items()}
+    stages, counters = {}, {}
+    for key, value in delta.items():
+        name, labels = key.split("{", 1)
+        labels = labels.rstrip("}")
+        if name == "agent_span_duration_seconds_count" and value:
+            total = delta.get(f"agent_span_duration_seconds_sum{{{labels}}}", 0.0)
+            stages[labels.split("=", 1)[1]] = {"count": int(value), "mean_ms": round(total / value * 1000, 1)}
+        elif name.endswith("_total") and value:
+            counters[f"{name}{{{labels}}}"] = int(value)
+    return {"stages": dict(sorted(stages.items())), "counters": counters}
+
+
+async def run(args) -> Dict:
+    queries = query_corpus(args.synthetic_queries)
+    load = LoadTest(args.url, queries, args.users, args.conversation_id, args.user_id, args.deadline_seconds)
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        started = time.monotonic()
+        until = started + args.duration
+        if args.rps:
+            await load.open_loop(client, args.rps, until, args.requests)
+        else:
+            await load.closed_loop(client, args.concurrency, until, args.requests)
+        elapsed = time.monotonic() - started
+    result = load.report(elapsed)
+    result["mode"] = {"rps": args.rps} if args.rps else {"concurrency": args.concurrency}
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8010")
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument("--concurrency", type=int, default=8, help="closed loop: requests in flight")
+    load.add_argument("--rps", type=float, help="open loop: requests started per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds to send for")
+    parser.add_argument("--requests", type=int, help="stop after this many requests")
+    parser.add_argument("--synthetic-queries", type=int, default=60, help="synthetic queries added to the README examples")
+    parser.add_argument("--users", type=int, default=32, help="distinct user_ids to spread requests over")
+    parser.add_argument("--user-id", help="send every request as this user (for a real database)")
+    parser.add_argument("--conversation-id", help="conversation to post to (for a real database)")
+    parser.add_argument("--deadline-seconds", type=float)
+    parser.add_argument("--timeout", type=float, default=120.0, help="client timeout per request")
+    parser.add_argument("--metrics", action="store_true", help="report server per-stage latency from /metrics")
+    parser.add_argument("--output", help="write the report as JSON to this path")
+    args = parser.parse_args()
+
+    if args.metrics:
+        with httpx.Client(timeout=10) as client:
+            before = scrape(client, args.url)
+    result = asyncio.run(run(args))
+    if args.metrics:
+        with httpx.Client(timeout=10) as client:
+            result["server"] = server_stages(before, scrape(client, args.url))
+
+    latency = result["latency_ms"]
+    print(f"{result['requests']} requests in {result['elapsed_seconds']}s: {result['throughput_rps']} req/s ok, "
+          f"error rate {result['error_rate']:.1%}")
+    print(f"latency p50 {latency['p50']}ms  p95 {latency['p95']}ms  p99 {latency['p99']}ms  max {latency['max']}ms")
+    print(f"status {result['status']}  served_by {result['served_by']}")
+    for name, stats in result.get("server", {}).get("stages", {}).items():
+        print(f"  {name:<28} {stats['count']:>6}x  mean {stats['mean_ms']:>8.1f}ms")
+    for name, count in result.get("server", {}).get("counters", {}).items():
+        print(f"  {name}: {count}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
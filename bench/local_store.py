@@ -0,0 +1,140 @@
+"""
+In-process stand-ins for the pgvector and SQL search tools
+
+Both tools keep the production tool interfaces (search_products/filter_products,
+deadlines, spans) but serve from a SyntheticCatalog held in NumPy arrays, so the
+agent and API can be benchmarked without Postgres.
+"""
+from typing import Any, Dict, List, Optional
+import numpy as np
+from agentic.tools.semantic_search import SemanticSearchTool
+from agentic.tools.structured_filter import StructuredFilterTool
+from agentic.utils.deadline import Deadline, DeadlineExceeded
+from agentic.utils.tracing import span
+from bench.catalog import SyntheticCatalog
+
+
+def _contains(names: List[str], codes: np.ndarray, term: str) -> np.ndarray:
+    """ILIKE '%term%' over a dictionary-encoded column"""
+    matching = [i for i, name in enumerate(names) if term.lower() in name.lower()]
+    return np.isin(codes, matching)
+
+
+def filter_mask(catalog: SyntheticCatalog, filters: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+    """Boolean row mask with the semantics of StructuredFilterTool.filter_products"""
+    if not filters:
+        return None
+    mask = np.ones(catalog.size, dtype=bool)
+    if filters.get("brand"):
+        mask &= _contains(catalog.brand_names, catalog.brand_codes, filters["brand"])
+    if filters.get("category"):
+        mask &= _contains(catalog.category_names, catalog.category_codes, filters["category"])
+    if filters.get("min_price") is not None:
+        mask &= catalog.prices >= filters["min_price"]
+    if filters.get("max_price") is not None:
+        mask &= catalog.prices <= filters["max_price"]
+    if filters.get("name_contains"):
+        term = filters["name_contains"].lower()
+        names = np.array([catalog.product(i)["name"].lower() for i in np.flatnonzero(mask)])
+        keep = np.char.find(names, term) >= 0 if len(names) else np.array([], dtype=bool)
+        rows = np.flatnonzero(mask)
+        mask[:] = False
+        mask[rows[keep]] = True
+    return mask
+
+
+class IvfIndex:
+    """Minimal IVFFlat: vectors bucketed by nearest centroid, search scans the `probes` closest buckets"""
+
+    def __init__(self, embeddings: np.ndarray, lists: int = 100, iterations: int = 5, seed: int = 7):
+        rng = np.random.default_rng(seed)
+        self.embeddings = embeddings
+        self.centroids = embeddings[rng.choice(len(embeddings), size=min(lists, len(embeddings)), replace=False)].copy()
+        # A few rounds of spherical k-means
+        for _ in range(iterations):
+            assignment = np.argmax(embeddings @ self.centroids.T, axis=1)
+            for i in range(len(self.centroids)):
+                members = embeddings[assignment == i]
+                if len(members):
+                    centroid = members.sum(axis=0)
+                    self.centroids[i] = centroid / np.linalg.norm(centroid)
+        assignment = np.argmax(embeddings @ self.centroids.T, axis=1)
+        self.lists = [np.flatnonzero(assignment == i) for i in range(len(self.centroids))]
+
+    def candidates(self, vector: np.ndarray, probes: int) -> np.ndarray:
+        nearest = np.argsort(-(self.centroids @ vector))[:probes]
+        return np.concatenate([self.lists[i] for i in nearest])
+
+
+class LocalSemanticSearchTool(SemanticSearchTool):
+    def __init__(self, catalog: SyntheticCatalog, embedding, index: Optional[IvfIndex] = None):
+        super().__init__(embedding=embedding)
+        self.catalog = catalog
+        # Without an index every search is exact; "ivfflat.probes" in search_settings applies to the index
+        self.index = index
+
+    def search_products(
+        self,
+        query: str,
+        top_k: Optional[int] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        deadline: Optional[Deadline] = None,
+        pairwise: bool = False
+    ) -> List[Dict[str, Any]]:
+        """Cosine search over the catalog embeddings, exact unless an index is set"""
+        search_vector = np.asarray(self.get_embedding(query, deadline), dtype=np.float32)
+        if deadline is not None and deadline.expired():
+            raise DeadlineExceeded("semantic_search")
+
+        with span("store.semantic_search"):
+            if self.index is None:
+                rows = np.arange(self.catalog.size)
+            else:
+                rows = self.index.candidates(search_vector, int(self.search_settings.get("ivfflat.probes", 1)))
+            similarities = self.catalog.embeddings[rows] @ search_vector
+            mask = filter_mask(self.catalog, filters)
+            if mask is not None:
+                similarities = np.where(mask[rows], similarities, -np.inf)
+            k = min(top_k or self.top_k, len(rows))
+            top = np.argpartition(-similarities, k - 1)[:k]
+            top = top[np.argsort(-similarities[top])]
+            top = top[np.isfinite(similarities[top])]
+            if pairwise:
+                vectors = self.catalog.embeddings[rows[top]]
+                pairwise_similarities = (vectors @ vectors.T).tolist()
+
+        products = []
+        for i, position in enumerate(top):
+            product = self.catalog.product(rows[position])
+            product["similarity_score"] = float(similarities[position])
+            if pairwise:
+                product["pairwise_similarities"] = pairwise_similarities[i]
+            products.append(product)
+        return products
+
+
+class LocalStructuredFilterTool(StructuredFilterTool):
+    def __init__(self, catalog: SyntheticCatalog):
+        super().__init__()
+        self.catalog = catalog
+
+    def filter_products(
+        self,
+        brand: Optional[str] = None,
+        category: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        name_contains: Optional[str] = None,
+        limit: Optional[int] = None,
+        deadline: Optional[Deadline] = None
+    ) -> List[Dict[str, Any]]:
+        with span("store.structured_filter"):
+            mask = filter_mask(self.catalog, {
+                "brand": brand, "category": category, "min_price": min_price,
+                "max_price": max_price, "name_contains": name_contains,
+            })
+            rows = np.flatnonzero(mask)[:limit or self.limit]
+        return [self.catalog.product(index) for index in rows]
+
+    def vocabulary(self) -> Dict[str, List[str]]:
+        return {"brands": self.catalog.brand_names, "categories": self.catalog.category_names}
@@ -0,0 +1,290 @@
+"""
+Ollama-compatible stand-in server for local benchmarks
+
+Serves the subset of the Ollama HTTP API used by ChatOllama/OllamaEmbeddings
+(/api/chat, /api/embed, /api/tags) and simulates the costs that matter for
+latency: model load time, keep_alive expiry, prompt prefill with per-slot
+prefix (KV) cache reuse, and per-token decoding.
+"""
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+DEFAULT_REPLY = "Here are some great options based on your search. Would you like more details about any of these?"
+DURATION_PATTERN = re.compile(r"^(-?\d+(?:\.\d+)?)(ms|s|m|h)?$")
+DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600, None: 1}
+
+
+def parse_keep_alive(value) -> float:
+    """Convert an Ollama keep_alive value into seconds (negative means forever)"""
+    if value is None or value == "":
+        return 300.0
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = DURATION_PATTERN.match(str(value).strip())
+    if not match:
+        return 300.0
+    return float(match.group(1)) * DURATION_UNITS[match.group(2)]
+
+
+def tokenize(text: str) -> List[str]:
+    """Cheap stand-in tokenizer: one token per 4 characters"""
+    return [text[i:i + 4] for i in range(0, len(text), 4)]
+
+
+def render_messages(messages: List[Dict]) -> str:
+    """Flatten chat messages the way a chat template would"""
+    return "".join(f"<|{m.get('role', 'user')}|>{m.get('content', '')}<|end|>" for m in messages)
+
+
+def common_prefix(a: List[str], b: List[str]) -> int:
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
+
+
+def hash_embedding(text: str, dimension: int) -> List[float]:
+    """Deterministic unit vector derived from the words of the text"""
+    vector = [0.0] * dimension
+    for word in re.findall(r"[a-z0-9]+", text.lower()):
+        digest = hashlib.md5(word.encode()).digest()
+        index = int.from_bytes(digest[:4], "little") % dimension
+        vector[index] += 1.0 if digest[4] % 2 else -1.0
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+class OllamaStub:
+    def __init__(
+        self,
+        prefill_ms_per_token: float = 0.5,
+        decode_ms_per_token: float = 15.0,
+        load_ms: float = 1500.0,
+        num_parallel: int = 4,
+        embedding_dimension: int = 256,
+        embed_ms: float = 5.0,
+        responder: Optional[Callable[[List[Dict], Optional[object]], str]] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.prefill_ms_per_token = prefill_ms_per_token
+        self.decode_ms_per_token = decode_ms_per_token
+        self.load_ms = load_ms
+        self.num_parallel = num_parallel
+        self.embedding_dimension = embedding_dimension
+        self.embed_ms = embed_ms
+        self.responder = responder or (lambda messages, fmt: DEFAULT_REPLY)
+        self.lock = threading.Lock()
+        self.loaded_until: Dict[str, float] = {}
+        self.slots: Dict[str, List[Dict]] = {}
+        self.stats = {"requests": 0, "prompt_tokens": 0, "cached_tokens": 0, "loads": 0}
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "OllamaStub":
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _ensure_loaded(self, model: str, keep_alive) -> float:
+        """Return the load delay for this request and extend the model's residency"""
+        now = time.monotonic()
+        ttl = parse_keep_alive(keep_alive)
+        with self.lock:
+            until = self.loaded_until.get(model)
+            delay = 0.0
+            if until is None or (until >= 0 and now > until):
+                delay = self.load_ms / 1000
+                self.slots[model] = []
+                self.stats["loads"] += 1
+            if ttl < 0:
+                self.loaded_until[model] = -1
+            elif ttl == 0:
+                # Unload right after this request, dropping the prompt cache with it
+                self.loaded_until[model] = 0
+            else:
+                self.loaded_until[model] = now + delay + ttl
+        return delay
+
+    def _prefill(self, model: str, tokens: List[str]) -> int:
+        """Pick the slot with the longest matching prefix and return the reused token count
+
+        Mirrors Ollama's multi-user cache: a slot whose cache would be truncated
+        is left intact and its matching prefix is copied into the least recently
+        used slot instead.
+        """
+        with self.lock:
+            slots = self.slots.setdefault(model, [])
+            best, reused = None, 0
+            for slot in slots:
+                match = common_prefix(slot["tokens"], tokens)
+                if best is None or match > reused:
+                    best, reused = slot, match
+
+            target = best
+            if best is None or len(best["tokens"]) > reused:
+                if len(slots) < self.num_parallel:
+                    target = {"tokens": []}
+                    slots.append(target)
+                else:
+                    target = min(slots, key=lambda slot: slot["used_at"])
+
+            target["tokens"] = tokens
+            target["used_at"] = time.monotonic()
+            self.stats["requests"] += 1
+            self.stats["prompt_tokens"] += len(tokens)
+            self.stats["cached_tokens"] += reused
+        return reused
+
+    def chat(self, body: Dict):
+        """Yield Ollama /api/chat response parts, sleeping to simulate model work"""
+        model = body.get("model", "")
+        started = time.monotonic()
+        load = self._ensure_loaded(model, body.get("keep_alive"))
+        time.sleep(load)
+
+        tokens = tokenize(render_messages(body.get("messages", [])))
+        reused = self._prefill(model, tokens)
+        prompt_eval = (len(tokens) - reused) * self.prefill_ms_per_token / 1000
+        time.sleep(prompt_eval)
+
+        reply_tokens = tokenize(self.responder(body.get("messages", []), body.get("format")))
+        for token in reply_tokens:
+            time.sleep(self.decode_ms_per_token / 1000)
+            yield {"message": {"role": "assistant", "content": token}, "done": False}
+
+        if parse_keep_alive(body.get("keep_alive")) == 0:
+            with self.lock:
+                self.loaded_until.pop(model, None)
+                self.slots[model] = []
+
+        yield {
+            "message": {"role": "assistant", "content": ""},
+            "done": True,
+            "done_reason": "stop",
+            "total_duration": int((time.monotonic() - started) * 1e9),
+            "load_duration": int(load * 1e9),
+            "prompt_eval_count": len(tokens) - reused,
+            "prompt_eval_duration": int(prompt_eval * 1e9),
+            "eval_count": len(reply_tokens),
+            "eval_duration": int(len(reply_tokens) * self.decode_ms_per_token * 1e6),
+        }
+
+    def embed(self, body: Dict) -> Dict:
+        model = body.get("model", "")
+        load = self._ensure_loaded(model, body.get("keep_alive"))
+        inputs = body.get("input", [])
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        time.sleep(load + self.embed_ms * len(inputs) / 1000)
+        dimension = body.get("dimensions") or self.embedding_dimension
+        return {"model": model, "embeddings": [hash_embedding(text, dimension) for text in inputs]}
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, payload: Dict, status: int = 200):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path == "/api/tags":
+                    self._send_json({"models": [{"name": model, "model": model} for model in stub.loaded_until]})
+                else:
+                    self._send_json({"error": "not found"}, status=404)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                created_at = datetime.now(timezone.utc).isoformat()
+
+                if self.path == "/api/embed":
+                    self._send_json(stub.embed(body))
+                    return
+                if self.path != "/api/chat":
+                    self._send_json({"error": "not found"}, status=404)
+                    return
+
+                parts = stub.chat(body)
+                if not body.get("stream", True):
+                    content = []
+                    for part in parts:
+                        content.append(part["message"]["content"])
+                        final = part
+                    final["message"]["content"] = "".join(content)
+                    self._send_json({"model": body.get("model"), "created_at": created_at, **final})
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                try:
+                    for part in parts:
+                        line = json.dumps({"model": body.get("model"), "created_at": created_at, **part}).encode() + b"\n"
+                        self.wfile.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+                        self.wfile.flush()
+                    self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    # Client stopped reading (e.g. after the first token)
+                    self.close_connection = True
+
+        return Handler
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the Ollama stand-in server")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--prefill-ms", type=float, default=0.5)
+    parser.add_argument("--decode-ms", type=float, default=15.0)
+    parser.add_argument("--load-ms", type=float, default=1500.0)
+    args = parser.parse_args()
+
+    stub = OllamaStub(
+        prefill_ms_per_token=args.prefill_ms,
+        decode_ms_per_token=args.decode_ms,
+        load_ms=args.load_ms,
+        port=args.port,
+    )
+    print(f"Ollama stand-in listening on {stub.base_url}")
+    stub.start()
+    try:
+        stub.thread.join()
+    except KeyboardInterrupt:
+        stub.stop()
@@ -0,0 +1,154 @@
+"""
+Time-to-first-token benchmark: legacy one-shot prompts vs stable-prefix templates
+
+Runs the orchestrator LLM calls for a query corpus against the Ollama stand-in
+and reports TTFT per call for both layouts: the legacy analyze, filter and
+response prompts, and the current plan and response templates. "request" is
+the summed TTFT of all calls one query makes.
+
+Usage:
+    python -m bench.prompt_prefix [--queries 20] [--output ttft.json]
+"""
+import argparse
+import json
+import statistics
+import time
+from typing import Dict, List
+from langchain_ollama import ChatOllama
+from agentic.prompts.templates import PLAN_TEMPLATE, RESPONSE_TEMPLATE
+from agentic.system_message import SYSTEM_MESSAGE
+from bench.ollama_stub import OllamaStub
+
+QUERIES = [
+    "I need comfortable running shoes",
+    "Show me Apple products under $500",
+    "What wireless headphones do you recommend?",
+    "Find Nike shoes for trail running",
+    "Waterproof smartwatches with GPS",
+    "Best laptop for video editing",
+    "Samsung phones between $300 and $700",
+    "Quiet mechanical keyboard for the office",
+]
+
+
+def fake_results(query: str) -> str:
+    return "\n".join(
+        f"{i}. {query.title()} Model {i} | Brand{i} | Category | ${50 * i:.2f} | sim 0.{90 - i}"
+        for i in range(1, 6)
+    )
+
+
+def legacy_prompts(query: str) -> Dict[str, str]:
+    """The one-shot f-string prompts used before the template layer"""
+    return {
+        "analyze": f"""
+        Analyze this user query and determine the best search approach:
+        Query: "{query}"
+        
+        Choose one:
+        - "semantic" for natural language descriptions (e.g., "comfortable shoes for running")
+        - "structured" for specific filters (e.g., "Nike shoes under $100")
+        - "both" for mixed queries
+        
+        Make sure respond with just the strategy name.
+        """,
+        "filter": f"""
+        Extract structured filters from this query: "{query}"
+        
+        Return a JSON object with these possible keys (only include if mentioned):
+        - brand: string
+        - category: string
+        - min_price: number
+        - max_price: number
+        - name_contains: string
+        
+        Example: {{"brand": "Nike", "max_price": 100}}
+        """,
+        "response": f"""
+        {SYSTEM_MESSAGE}
+        
+        User Query: "{query}"
+        Search Results: {fake_results(query)}
+        
+        Based on the search results, provide a response following your role as ProductFinder.
+        """,
+    }
+
+
+def template_prompts(query: str) -> Dict[str, list]:
+    return {
+        "plan": PLAN_TEMPLATE.build(query=query),
+        "response": RESPONSE_TEMPLATE.build(query=query, search_results=fake_results(query)),
+    }
+
+
+def time_to_first_token(llm: ChatOllama, prompt) -> float:
+    started = time.perf_counter()
+    for chunk in llm.stream(prompt):
+        if chunk.content:
+            return time.perf_counter() - started
+    return time.perf_counter() - started
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        "mean_ms": statistics.mean(ordered) * 1000,
+        "p50_ms": ordered[len(ordered) // 2] * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+    }
+
+
+def run_layout(name: str, build, queries: List[str], stub_options: Dict) -> Dict:
+    with OllamaStub(**stub_options) as stub:
+        llm = ChatOllama(model="qwen3:8b", base_url=stub.base_url, keep_alive=1800)
+        # Load the model once so both layouts start warm
+        time_to_first_token(llm, "warm up")
+
+        samples: Dict[str, List[float]] = {"request": []}
+        for query in queries:
+            total = 0.0
+            for call, prompt in build(query).items():
+                elapsed = time_to_first_token(llm, prompt)
+                samples.setdefault(call, []).append(elapsed)
+                total += elapsed
+            samples["request"].append(total)
+
+        result = {call: summarize(values) for call, values in samples.items()}
+        result["cache_hit_ratio"] = stub.stats["cached_tokens"] / max(1, stub.stats["prompt_tokens"])
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--queries", type=int, default=len(QUERIES) * 2)
+    parser.add_argument("--prefill-ms", type=float, default=0.5, help="simulated prefill cost per token")
+    parser.add_argument("--decode-ms", type=float, default=15.0, help="simulated decode cost per token")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args()
+
+    queries = [QUERIES[i % len(QUERIES)] + ("" if i < len(QUERIES) else f" (variant {i})") for i in range(args.queries)]
+    stub_options = {"prefill_ms_per_token": args.prefill_ms, "decode_ms_per_token": args.decode_ms}
+
+    results = {
+        "legacy": run_layout("legacy", legacy_prompts, queries, stub_options),
+        "templates": run_layout("templates", template_prompts, queries, stub_options),
+    }
+
+    for layout, calls in results.items():
+        print(f"{layout}:")
+        for call, stats in calls.items():
+            if call != "cache_hit_ratio":
+                print(f"  {call:<10} p50 {stats['p50_ms']:>8.1f}ms  p95 {stats['p95_ms']:>8.1f}ms")
+    speedup = results["legacy"]["request"]["p50_ms"] / results["templates"]["request"]["p50_ms"]
+    print(f"request p50 speedup: {speedup:.2f}x")
+    print(f"prefix cache hit ratio: legacy {results['legacy']['cache_hit_ratio']:.0%}, "
+          f"templates {results['templates']['cache_hit_ratio']:.0%}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
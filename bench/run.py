@@ -0,0 +1,277 @@
+"""
+Offline benchmark: per-stage latency, throughput and memory of the agent and API
+
+Drives OrchestratorAgent and the FastAPI /chat endpoint with fake chat and
+embedding models (bench.fakes) over a synthetic catalog held in memory
+(bench.local_store), so no Ollama or Postgres is needed. Results are written
+as JSON; with --baseline, latency/throughput/memory are compared against an
+earlier run and the exit status is 1 if any regressed by more than --tolerance.
+
+Usage:
+    python -m bench.run [--catalog-size 10000] [--concurrency 1,4,16] \
+        [--output bench.json] [--baseline previous.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from typing import Dict, List
+from uuid import UUID, uuid4
+
+# The API module builds its database engine at import time; nothing here touches it
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import httpx
+from agentic.agents.orchestrator import OrchestratorAgent
+from agentic.agents.planner import QueryPlanner
+from agentic.api.warmup import StartupReport, warm_up
+from bench.catalog import SyntheticCatalog
+from bench.fakes import FakeChatModel, FakeEmbeddings, generation_responder, planner_responder
+from agentic.utils.query_log import QueryLog
+from bench.local_store import LocalSemanticSearchTool, LocalStructuredFilterTool
+
+CONVERSATION_ID = UUID("00000000-0000-4000-8000-000000000001")
+
+
+def build_agent(catalog: SyntheticCatalog, options: Dict) -> OrchestratorAgent:
+    """An OrchestratorAgent whose models and stores are all in-process fakes"""
+    latency = {
+        "call_overhead_ms": options.get("llm_overhead_ms", 20.0),
+        "prefill_ms_per_token": options.get("prefill_ms", 0.2),
+        "decode_ms_per_token": options.get("decode_ms", 10.0),
+    }
+    embedding = FakeEmbeddings(catalog, latency_ms=options.get("embed_ms", 15.0))
+    agent = OrchestratorAgent(
+        llm=FakeChatModel(responder=generation_responder, **latency),
+        planner=QueryPlanner(llm=FakeChatModel(responder=planner_responder(catalog), **latency)),
+        semantic_search=LocalSemanticSearchTool(catalog, embedding),
+        structured_filter=LocalStructuredFilterTool(catalog),
+        # Not logged unless a path is given, so runs don't pre-warm each other
+        query_log=QueryLog(path=options.get("query_log_path", "")),
+    )
+    agent.load_vocabulary()
+    return agent
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    if not ordered:
+        return {"count": 0}
+    return {
+        "count": len(ordered),
+        "mean_ms": round(statistics.mean(ordered), 2),
+        "p50_ms": round(ordered[len(ordered) // 2], 2),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 2),
+        "max_ms": round(ordered[-1], 2),
+    }
+
+
+def measure_stages(agent: OrchestratorAgent, queries: List[str]) -> Dict:
+    """Run queries one at a time and aggregate the span timings of each"""
+    spans: Dict[str, List[float]] = {}
+    totals, served_by = [], {}
+    for query in queries:
+        result = agent.chat(query)
+        totals.append(result["timings"]["total_ms"])
+        served_by[result["served_by"]] = served_by.get(result["served_by"], 0) + 1
+        for recorded in result["timings"]["spans"]:
+            spans.setdefault(recorded["name"], []).append(recorded["duration_ms"])
+    return {
+        "total": percentiles(totals),
+        "spans": {name: percentiles(samples) for name, samples in sorted(spans.items())},
+        "served_by": served_by,
+    }
+
+
+def measure_agent_throughput(agent: OrchestratorAgent, queries: List[str], concurrency: int) -> Dict:
+    """Closed loop: `concurrency` threads calling agent.chat back to back"""
+    latencies: List[float] = []
+
+    def call(query: str):
+        started = time.perf_counter()
+        agent.chat(query)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(call, queries))
+    elapsed = time.perf_counter() - started
+    return {"rps": round(len(queries) / elapsed, 2), "latency": percentiles(latencies)}
+
+
+class BenchSession:
+    """Enough of a SQLAlchemy session for /chat to find its conversation"""
+
+    def query(self, *args):
+        return self
+
+    def filter(self, *args):
+        return self
+
+    def first(self):
+        return SimpleNamespace(id=CONVERSATION_ID)
+
+    def rollback(self):
+        pass
+
+
+def api_app(agent: OrchestratorAgent):
+    from agentic.api import main
+    from agentic.database.connection import get_db
+
+    main.app.state.agent = agent
+    main.app.dependency_overrides[get_db] = lambda: BenchSession()
+    return main.app
+
+
+async def _drive_api(app, queries: List[str], concurrency: int) -> Dict:
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    pending = list(reversed(queries))
+
+    async def worker(client: httpx.AsyncClient):
+        # One user per worker, as with separate browser sessions
+        user_id = str(uuid4())
+        while pending:
+            query = pending.pop()
+            started = time.perf_counter()
+            response = await client.post("/chat", json={
+                "message": query, "conversation_id": str(CONVERSATION_ID), "user_id": user_id,
+            })
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return {"rps": round(len(queries) / elapsed, 2), "latency": percentiles(latencies), "status": statuses}
+
+
+def measure_api_throughput(agent: OrchestratorAgent, queries: List[str], concurrency: int) -> Dict:
+    """Closed loop through the ASGI app, including admission control"""
+    return asyncio.run(_drive_api(api_app(agent), queries, concurrency))
+
+
+def memory_mb() -> float:
+    """Peak resident set size of this process"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes on Linux
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+
+
+def flatten(results: Dict, prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)):
+            flat[name] = value
+    return flat
+
+
+def regressions(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Metrics that got worse than the baseline by more than `tolerance` (a fraction)"""
+    current, previous = flatten(results), flatten(baseline)
+    found = []
+    for name, before in previous.items():
+        after = current.get(name)
+        if after is None or not before or name.startswith("config."):
+            continue
+        if name.endswith("_ms") or name.endswith("_mb"):
+            change = (after - before) / before
+        elif name.endswith("rps"):
+            change = (before - after) / before
+        else:
+            continue
+        if change > tolerance:
+            found.append(f"{name}: {before} -> {after} ({change:+.0%} worse)")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--catalog-size", type=int, default=10_000)
+    parser.add_argument("--dimension", type=int, default=128)
+    parser.add_argument("--queries", type=int, default=40)
+    parser.add_argument("--concurrency", default="1,4,16", help="comma-separated concurrency levels")
+    parser.add_argument("--llm-overhead-ms", type=float, default=20.0, help="simulated fixed cost per LLM call")
+    parser.add_argument("--prefill-ms", type=float, default=0.2, help="simulated prefill cost per prompt token")
+    parser.add_argument("--decode-ms", type=float, default=10.0, help="simulated decode cost per generated token")
+    parser.add_argument("--embed-ms", type=float, default=15.0, help="simulated latency per embedding")
+    parser.add_argument("--skip-api", action="store_true", help="only drive the agent, not the FastAPI app")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    parser.add_argument("--baseline", help="JSON from an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed regression as a fraction")
+    args = parser.parse_args()
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    catalog = SyntheticCatalog(args.catalog_size, args.dimension)
+    catalog_seconds = time.perf_counter() - started
+    catalog_mb = tracemalloc.get_traced_memory()[0] / (1024 * 1024)
+    tracemalloc.reset_peak()
+
+    agent = build_agent(catalog, vars(args))
+    queries = catalog.query_corpus(args.queries)
+    # The same warm-up the API runs at startup, then check the first request is not slower than the rest
+    report = StartupReport()
+    warm_up(agent, report)
+    report.mark_ready()
+    started = time.perf_counter()
+    agent.chat(queries[0])
+    first_request_ms = (time.perf_counter() - started) * 1000
+
+    results = {
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+        "catalog": {"build_ms": round(catalog_seconds * 1000, 1), "size": catalog.size},
+        "startup": {"warm_up_ms": report.ready_ms, "first_request_ms": round(first_request_ms, 2)},
+        "stages": measure_stages(agent, queries),
+        "agent": {str(level): measure_agent_throughput(agent, queries, level) for level in levels},
+    }
+    if not args.skip_api:
+        results["api"] = {str(level): measure_api_throughput(agent, queries, level) for level in levels}
+    results["memory"] = {
+        "catalog_mb": round(catalog_mb, 1),
+        "run_peak_mb": round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 1),
+        "max_rss_mb": memory_mb(),
+    }
+    tracemalloc.stop()
+
+    print(f"catalog: {catalog.size} products built in {results['catalog']['build_ms']:.0f}ms")
+    print(f"warm-up {results['startup']['warm_up_ms']:.0f}ms, first request {results['startup']['first_request_ms']:.1f}ms")
+    print(f"request p50 {results['stages']['total']['p50_ms']:.1f}ms  p95 {results['stages']['total']['p95_ms']:.1f}ms")
+    for name, stats in results["stages"]["spans"].items():
+        print(f"  {name:<28} p50 {stats['p50_ms']:>8.1f}ms  p95 {stats['p95_ms']:>8.1f}ms")
+    for target in ("agent", "api"):
+        for level, stats in results.get(target, {}).items():
+            print(f"{target:<5} concurrency {level:>3}: {stats['rps']:>7.1f} req/s  p95 {stats['latency']['p95_ms']:.1f}ms")
+    print(f"memory: catalog {results['memory']['catalog_mb']}MB, max rss {results['memory']['max_rss_mb']}MB")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        found = regressions(results, baseline, args.tolerance)
+        for line in found:
+            print(f"REGRESSION {line}")
+        if found:
+            sys.exit(1)
+        print(f"no regressions beyond {args.tolerance:.0%} of {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+-- Notify listeners (the API's in-memory catalog snapshot) of product changes.
+-- The payload is the product id; listeners re-read the row, so one function serves insert, update and delete.
+
+-- CreateFunction
+CREATE OR REPLACE FUNCTION "notify_product_change"() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        PERFORM pg_notify('product_changes', OLD.id::text);
+        RETURN OLD;
+    END IF;
+    IF TG_OP = 'UPDATE' AND OLD.id <> NEW.id THEN
+        PERFORM pg_notify('product_changes', OLD.id::text);
+    END IF;
+    PERFORM pg_notify('product_changes', NEW.id::text);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- CreateTrigger
+CREATE TRIGGER "products_notify_change"
+AFTER INSERT OR UPDATE OR DELETE ON "products"
+FOR EACH ROW EXECUTE FUNCTION "notify_product_change"();
+
+-- Truncate has no rows; listeners reload the whole catalog on an empty payload
+CREATE OR REPLACE FUNCTION "notify_products_truncated"() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('product_changes', '');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER "products_notify_truncate"
+AFTER TRUNCATE ON "products"
+FOR EACH STATEMENT EXECUTE FUNCTION "notify_products_truncated"();
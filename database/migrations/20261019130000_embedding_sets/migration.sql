@@ -0,0 +1,24 @@
+-- CreateEnum
+CREATE TYPE "EmbeddingSetStatus" AS ENUM ('building', 'ready', 'active', 'retired', 'failed');
+
+-- CreateTable
+CREATE TABLE "embedding_sets" (
+    "id" SERIAL NOT NULL,
+    "model" VARCHAR(255) NOT NULL,
+    "dimension" INTEGER NOT NULL,
+    "table_name" VARCHAR(63) NOT NULL,
+    "status" "EmbeddingSetStatus" NOT NULL DEFAULT 'building',
+    "metrics" JSONB,
+    "activated_at" TIMESTAMP(3),
+    "created_at" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "updated_at" TIMESTAMP(3) NOT NULL,
+    "deleted_at" TIMESTAMP(3),
+
+    CONSTRAINT "embedding_sets_pkey" PRIMARY KEY ("id")
+);
+
+-- CreateIndex
+CREATE UNIQUE INDEX "embedding_sets_table_name_key" ON "embedding_sets"("table_name");
+
+-- At most one active set; a partial index cannot be expressed in schema.prisma
+CREATE UNIQUE INDEX "embedding_sets_one_active" ON "embedding_sets"("status") WHERE "status" = 'active' AND "deleted_at" IS NULL;
@@ -8,10 +8,15 @@ import google.generativeai as genai
 import os
 
 class EmbeddingModel:
+    # '<provider>:<model>', the tag of the embedding sets this model builds
+    name = ""
+
     def get_embedding(self, text: str) -> List[float]:
         raise NotImplementedError
 
 class GeminiEmbedding(EmbeddingModel):
+    name = "gemini:models/embedding-001"
+
     def __init__(self):
         genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
     
@@ -24,6 +29,8 @@ class GeminiEmbedding(EmbeddingModel):
         return result['embedding']
 
 class VoyageEmbedding(EmbeddingModel):
+    name = "voyage:voyage-large-2"
+
     def __init__(self):
         import voyageai
         self.client = voyageai.Client(api_key=os.getenv("VOYAGE_AI_SECRET"))
@@ -34,6 +41,8 @@ class VoyageEmbedding(EmbeddingModel):
         return result.embeddings[0]
 
 class JinaEmbedding(EmbeddingModel):
+    name = "jina:jina-embeddings-v2-base-en"
+
     def __init__(self):
         self.api_key = os.getenv("JINA_AI_SECRET")
         self.url = "https://api.jina.ai/v1/embeddings"
@@ -56,6 +65,7 @@ class OllamaEmbeddingModel(EmbeddingModel):
     def __init__(self, provider: Provider = Provider.OLLAMA, model: Model = Model.QWEN3_8B):
         self.provider = Provider.OLLAMA if provider is None else provider
         self.model = Model.QWEN3_8B if model is None else model
+        self.name = f"ollama:{self.model.value if isinstance(self.model, Model) else self.model}"
         self.embedding = self.get()
 
     def get(self) -> OllamaEmbeddings:
@@ -70,9 +80,12 @@ class OllamaEmbeddingModel(EmbeddingModel):
         vector = self.embedding.embed_query(text)
         return vector
 
-def create_embedding_model() -> EmbeddingModel:
-    """Factory function to create embedding model based on EMBEDDING_MODEL env var"""
-    model_type = os.getenv("EMBEDDING_MODEL", "gemini").lower()
+def create_embedding_model(model_type: str = None) -> EmbeddingModel:
+    """Factory function to create embedding model based on EMBEDDING_MODEL env var
+
+    Accepts gemini, voyage, jina, or ollama[:<model>] (qwen3:8b by default); a set's model tag works too.
+    """
+    model_type = (model_type or os.getenv("EMBEDDING_MODEL", "gemini")).lower()
     
     if model_type == "gemini":
         return GeminiEmbedding()
@@ -80,6 +93,12 @@ def create_embedding_model() -> EmbeddingModel:
         return VoyageEmbedding()
     elif model_type == "jina":
         return JinaEmbedding()
+    elif model_type.startswith("gemini:"):
+        return GeminiEmbedding()
+    elif model_type.startswith("voyage:"):
+        return VoyageEmbedding()
+    elif model_type.startswith("jina:"):
+        return JinaEmbedding()
     else:
         print("Init Ollama model embedding")
-        return OllamaEmbeddingModel()
\ No newline at end of file
+        return OllamaEmbeddingModel(model=model_type.split(":", 1)[1] if model_type.startswith("ollama:") else None)
\ No newline at end of file
@@ -29,10 +29,39 @@ def get_embedding(text: str) -> list:
     return embedding_model.get_embedding(text)
 
 
+def active_set(db):
+    """(id, model, dimension, table_name) of the active embedding set, or None before any set exists"""
+    try:
+        return db.execute(text("""
+            SELECT id, model, dimension, table_name FROM embedding_sets
+            WHERE status = 'active' AND deleted_at IS NULL
+        """)).fetchone()
+    except Exception:
+        # embedding_sets migration not applied yet
+        db.rollback()
+        return None
+
+
+def target_table(db) -> str:
+    """Table new embeddings go to; refuses a model other than the active set's, which would mix vector spaces"""
+    embedding_set = active_set(db)
+    if embedding_set is None:
+        return "product_embeddings"
+    if embedding_set.model != embedding_model.name:
+        raise SystemExit(
+            f"EMBEDDING_MODEL is {embedding_model.name} but the active embedding set {embedding_set.id} "
+            f"was built with {embedding_set.model}; set EMBEDDING_MODEL to match, or build a new set with reindex.py"
+        )
+    return embedding_set.table_name
+
+
 def ingest_products():
     """Main ingestion function"""
     db = SessionLocal()
     try:
+        table = target_table(db)
+        print(f"Writing embeddings from {embedding_model.name} to {table}")
+
         # Get all products
         result = db.execute(text("SELECT * FROM products"))
         products = result.fetchall()
@@ -41,7 +70,7 @@ def ingest_products():
         for product in products:
             # Check if embedding already exists
             existing = db.execute(text(
-                "SELECT id FROM product_embeddings WHERE product_id = :product_id"
+                f"SELECT id FROM {table} WHERE product_id = :product_id"
             ), {"product_id": product[0]}).fetchone()
 
             if existing:
@@ -77,8 +106,8 @@ def ingest_products():
                 # embedding_text = str(embedding)
 
                 # Insert embedding
-                db.execute(text("""
-                    INSERT INTO product_embeddings (product_id, embedding, document_text)
+                db.execute(text(f"""
+                    INSERT INTO {table} (product_id, embedding, document_text)
                     VALUES (:product_id, :embedding, :document_text)
                 """), {
                     "product_id": product[0],
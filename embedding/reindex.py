@@ -0,0 +1,333 @@
+"""
+Blue/green re-indexing of product embeddings
+
+A new embedding model or dimension gets its own embedding set: a shadow table
+of product vectors built next to the active one while search keeps serving,
+then validated for coverage, recall and latency, and switched to in a single
+transaction. API workers pick up the switch within EMBEDDING_SET_REFRESH_SECONDS
+and refuse query vectors from any other model, so two vector spaces are never
+mixed. The previous set is kept (retired) for rollback until it is dropped.
+
+Usage (from embedding/, like ingest.py):
+    python reindex.py status
+    python reindex.py adopt --model ollama:qwen3:8b     # register product_embeddings as the active set
+    python reindex.py build --model ollama:nomic-embed-text --activate
+    python reindex.py build --resume 3                  # continue an interrupted build
+    python reindex.py validate 3
+    python reindex.py activate 3                        # also rolls back to a retired set
+    python reindex.py drop 2
+"""
+import argparse
+import json
+import math
+import os
+import statistics
+import time
+from sqlalchemy import text
+from ingest import SessionLocal, engine, create_document_text
+from factory.embedding import create_embedding_model
+
+LEGACY_TABLE = "product_embeddings"
+# pgvector cannot build an HNSW index on wider vector columns
+MAX_INDEXED_DIMENSION = 2000
+
+MIN_COVERAGE = float(os.getenv("REINDEX_MIN_COVERAGE", "0.99"))
+MIN_RECALL = float(os.getenv("REINDEX_MIN_RECALL", "0.8"))
+MIN_INDEX_RECALL = float(os.getenv("REINDEX_MIN_INDEX_RECALL", "0.9"))
+MAX_P95_MS = float(os.getenv("REINDEX_MAX_P95_MS", "200"))
+
+
+def vector_text(vector) -> str:
+    return '[' + ','.join(map(str, vector)) + ']'
+
+
+def get_set(db, set_id: int):
+    embedding_set = db.execute(text(
+        "SELECT * FROM embedding_sets WHERE id = :id AND deleted_at IS NULL"
+    ), {"id": set_id}).fetchone()
+    if embedding_set is None:
+        raise SystemExit(f"Embedding set {set_id} not found")
+    return embedding_set
+
+
+def create_set(db, model):
+    """Register a set for the model and create its empty shadow table"""
+    dimension = len(model.get_embedding("dimension probe"))
+    set_id = db.execute(text("SELECT nextval(pg_get_serial_sequence('embedding_sets', 'id'))")).scalar()
+    table = f"product_embeddings_v{set_id}"
+    db.execute(text("""
+        INSERT INTO embedding_sets (id, model, dimension, table_name, status, updated_at)
+        VALUES (:id, :model, :dimension, :table, 'building', CURRENT_TIMESTAMP)
+    """), {"id": set_id, "model": model.name, "dimension": dimension, "table": table})
+    db.execute(text(f"""
+        CREATE TABLE "{table}" (
+            "id" SERIAL PRIMARY KEY,
+            "product_id" INTEGER NOT NULL UNIQUE REFERENCES "products"("id") ON DELETE CASCADE,
+            "embedding" vector({dimension}) NOT NULL,
+            "document_text" TEXT NOT NULL,
+            "created_at" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            "updated_at" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            "deleted_at" TIMESTAMP(3)
+        )
+    """))
+    db.commit()
+    print(f"Created embedding set {set_id}: {model.name}, {dimension} dimensions, table {table}")
+    return get_set(db, set_id)
+
+
+def embed_missing(db, embedding_set, model, batch_size: int = 32) -> int:
+    """Embed every product that has no row in the set's table yet; safe to re-run after an interruption"""
+    table = embedding_set.table_name
+    # Seeded with an id that never exists: an empty array literal has no type
+    failed = [0]
+    embedded = 0
+    while True:
+        products = db.execute(text(f"""
+            SELECT p.* FROM products p
+            WHERE NOT EXISTS (SELECT 1 FROM "{table}" e WHERE e.product_id = p.id)
+              AND p.id <> ALL(:failed)
+            ORDER BY p.id
+            LIMIT :limit
+        """), {"failed": failed, "limit": batch_size}).fetchall()
+        if not products:
+            break
+
+        for product in products:
+            doc_text = create_document_text(product)
+            try:
+                embedding = model.get_embedding(doc_text)
+                if len(embedding) != embedding_set.dimension:
+                    raise ValueError(f"got {len(embedding)} dimensions, the set has {embedding_set.dimension}")
+                db.execute(text(f"""
+                    INSERT INTO "{table}" (product_id, embedding, document_text)
+                    VALUES (:product_id, :embedding, :document_text)
+                    ON CONFLICT (product_id) DO NOTHING
+                """), {"product_id": product[0], "embedding": vector_text(embedding), "document_text": doc_text})
+                embedded += 1
+            except Exception as e:
+                print(f"✗ Failed to embed {product[1]}: {e}")
+                failed.append(product[0])
+        db.commit()
+        print(f"Embedded {embedded} products into {table}")
+    return embedded
+
+
+def build_index(embedding_set) -> bool:
+    """HNSW cosine index on the shadow table, built without blocking writes"""
+    if embedding_set.dimension > MAX_INDEXED_DIMENSION:
+        print(f"No vector index: {embedding_set.dimension} dimensions exceeds pgvector's {MAX_INDEXED_DIMENSION}, searches scan the table")
+        return False
+    table = embedding_set.table_name
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{table}_embedding_idx" ON "{table}" USING hnsw (embedding vector_cosine_ops)'
+        ))
+    print(f"Built HNSW index on {table}")
+    return True
+
+
+def nearest(db, table: str, vector: str, k: int, exact: bool = False):
+    """Top-k product ids by cosine distance; `exact` disables index scans for ground truth"""
+    if exact:
+        db.execute(text("SET LOCAL enable_indexscan = off"))
+        db.execute(text("SET LOCAL enable_bitmapscan = off"))
+    rows = db.execute(text(f"""
+        SELECT product_id FROM "{table}"
+        ORDER BY embedding <=> cast(:vector as vector)
+        LIMIT :k
+    """), {"vector": vector, "k": k}).fetchall()
+    db.rollback()
+    return [row[0] for row in rows]
+
+
+def validate(db, embedding_set, model, sample_size: int = 50, k: int = 10) -> bool:
+    """Check coverage, recall and latency; marks the set ready or failed and stores the metrics"""
+    table = embedding_set.table_name
+    products = db.execute(text("SELECT count(*) FROM products")).scalar()
+    embedded = db.execute(text(f'SELECT count(*) FROM "{table}"')).scalar()
+    sample = db.execute(text(f"""
+        SELECT p.id, p.name, p.brand FROM products p
+        JOIN "{table}" e ON e.product_id = p.id
+        ORDER BY random() LIMIT :n
+    """), {"n": sample_size}).fetchall()
+
+    hits = 0
+    overlaps = []
+    latencies = []
+    for product_id, name, brand in sample:
+        # A product's own brand and name should find it
+        vector = vector_text(model.get_embedding(" ".join(part for part in (brand, name) if part)))
+        started = time.perf_counter()
+        found = nearest(db, table, vector, k)
+        latencies.append((time.perf_counter() - started) * 1000)
+        hits += product_id in found
+        exact = nearest(db, table, vector, k, exact=True)
+        overlaps.append(len(set(found) & set(exact)) / max(len(exact), 1))
+
+    latencies.sort()
+    metrics = {
+        "products": products,
+        "embedded": embedded,
+        "coverage": embedded / products if products else 0.0,
+        "sample": len(sample),
+        "k": k,
+        "recall": hits / len(sample) if sample else 0.0,
+        "index_recall": statistics.mean(overlaps) if overlaps else 0.0,
+        "p50_ms": round(statistics.median(latencies), 2) if latencies else None,
+        "p95_ms": round(latencies[min(len(latencies) - 1, math.ceil(0.95 * len(latencies)) - 1)], 2) if latencies else None,
+        "validated_at": time.time(),
+    }
+    failures = []
+    if metrics["coverage"] < MIN_COVERAGE:
+        failures.append(f"coverage {metrics['coverage']:.3f} < {MIN_COVERAGE}")
+    if metrics["recall"] < MIN_RECALL:
+        failures.append(f"recall@{k} {metrics['recall']:.3f} < {MIN_RECALL}")
+    if metrics["index_recall"] < MIN_INDEX_RECALL:
+        failures.append(f"index recall {metrics['index_recall']:.3f} < {MIN_INDEX_RECALL}")
+    if metrics["p95_ms"] is None or metrics["p95_ms"] > MAX_P95_MS:
+        failures.append(f"p95 {metrics['p95_ms']}ms > {MAX_P95_MS}ms")
+    metrics["failures"] = failures
+
+    # An active or retired set keeps its status; only a candidate is promoted or failed
+    db.execute(text("""
+        UPDATE embedding_sets
+        SET metrics = cast(:metrics as jsonb),
+            status = CASE WHEN status IN ('active', 'retired') THEN status ELSE cast(:status as "EmbeddingSetStatus") END,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE id = :id
+    """), {"metrics": json.dumps(metrics), "status": "failed" if failures else "ready", "id": embedding_set.id})
+    db.commit()
+
+    print(json.dumps(metrics, indent=2))
+    print(f"Embedding set {embedding_set.id} {'failed: ' + '; '.join(failures) if failures else 'passed validation'}")
+    return not failures
+
+
+def activate(db, embedding_set):
+    """Make the set the one search uses, retiring the current one, in one transaction"""
+    if embedding_set.status not in ("ready", "retired"):
+        raise SystemExit(f"Embedding set {embedding_set.id} is {embedding_set.status}; only ready or retired sets can be activated")
+    # Products added since the build would otherwise be missing from search
+    embed_missing(db, embedding_set, create_embedding_model(embedding_set.model))
+
+    db.execute(text("LOCK TABLE embedding_sets IN SHARE ROW EXCLUSIVE MODE"))
+    db.execute(text("""
+        UPDATE embedding_sets SET status = 'retired', updated_at = CURRENT_TIMESTAMP
+        WHERE status = 'active' AND deleted_at IS NULL
+    """))
+    db.execute(text("""
+        UPDATE embedding_sets SET status = 'active', activated_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
+        WHERE id = :id
+    """), {"id": embedding_set.id})
+    db.commit()
+    print(f"Activated embedding set {embedding_set.id} ({embedding_set.model}); API workers switch within EMBEDDING_SET_REFRESH_SECONDS")
+
+
+def adopt(db, model, force: bool = False):
+    """Register the existing product_embeddings table as the active set, after checking it was built with `model`"""
+    if db.execute(text("SELECT id FROM embedding_sets WHERE status = 'active' AND deleted_at IS NULL")).fetchone():
+        raise SystemExit("An embedding set is already active")
+    dimension = db.execute(text("""
+        SELECT atttypmod FROM pg_attribute
+        WHERE attrelid = cast(:table as regclass) AND attname = 'embedding'
+    """), {"table": LEGACY_TABLE}).scalar()
+
+    stored = db.execute(text(f"SELECT document_text, embedding::text FROM {LEGACY_TABLE} LIMIT 1")).fetchone()
+    if stored is not None and not force:
+        # Re-embed one stored document: the same model reproduces (almost) the same vector
+        fresh = model.get_embedding(stored[0])
+        existing = json.loads(stored[1])
+        similarity = 0.0
+        if len(fresh) == len(existing):
+            dot = sum(a * b for a, b in zip(fresh, existing))
+            similarity = dot / (math.sqrt(sum(a * a for a in fresh)) * math.sqrt(sum(b * b for b in existing)) or 1.0)
+        if similarity < 0.99:
+            raise SystemExit(f"{LEGACY_TABLE} does not look like {model.name} vectors (similarity {similarity:.3f}); pass --force to adopt anyway")
+
+    db.execute(text("""
+        INSERT INTO embedding_sets (model, dimension, table_name, status, activated_at, updated_at)
+        VALUES (:model, :dimension, :table, 'active', CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+    """), {"model": model.name, "dimension": dimension, "table": LEGACY_TABLE})
+    db.commit()
+    print(f"Adopted {LEGACY_TABLE} as the active embedding set ({model.name}, {dimension} dimensions)")
+
+
+def drop(db, embedding_set):
+    """Drop a set that is not active; the row is kept, soft-deleted, as history"""
+    if embedding_set.status == "active":
+        raise SystemExit("Cannot drop the active embedding set; activate another one first")
+    # The Prisma-managed table stays, only its registration goes
+    if embedding_set.table_name != LEGACY_TABLE:
+        db.execute(text(f'DROP TABLE IF EXISTS "{embedding_set.table_name}"'))
+    db.execute(text("""
+        UPDATE embedding_sets SET status = 'retired', deleted_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
+        WHERE id = :id
+    """), {"id": embedding_set.id})
+    db.commit()
+    print(f"Dropped embedding set {embedding_set.id}")
+
+
+def status(db):
+    sets = db.execute(text("""
+        SELECT id, model, dimension, table_name, status, metrics, activated_at, created_at
+        FROM embedding_sets WHERE deleted_at IS NULL ORDER BY id
+    """)).fetchall()
+    if not sets:
+        print(f"No embedding sets; search uses {LEGACY_TABLE} without a model check")
+    for row in sets:
+        metrics = row.metrics or {}
+        quality = f"recall {metrics['recall']:.2f}, p95 {metrics['p95_ms']}ms" if "recall" in metrics else "not validated"
+        print(f"{row.id:>4}  {row.status:<8}  {row.model:<35} {row.dimension:>5}d  {row.table_name:<24} {quality}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build, validate and switch versioned embedding sets")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("status")
+    adopt_parser = commands.add_parser("adopt")
+    adopt_parser.add_argument("--model", required=True, help="e.g. ollama:qwen3:8b")
+    adopt_parser.add_argument("--force", action="store_true")
+    build_parser = commands.add_parser("build")
+    build_parser.add_argument("--model", help="gemini, voyage, jina or ollama:<model>; defaults to EMBEDDING_MODEL")
+    build_parser.add_argument("--resume", type=int, help="continue building this set")
+    build_parser.add_argument("--batch-size", type=int, default=32)
+    build_parser.add_argument("--activate", action="store_true", help="switch to the set if it passes validation")
+    for name in ("validate", "activate", "drop"):
+        commands.add_parser(name).add_argument("set_id", type=int)
+    for command_parser in (build_parser, commands.choices["validate"]):
+        command_parser.add_argument("--sample-size", type=int, default=50)
+        command_parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.command == "status":
+            status(db)
+        elif args.command == "adopt":
+            adopt(db, create_embedding_model(args.model), args.force)
+        elif args.command == "build":
+            if args.resume:
+                embedding_set = get_set(db, args.resume)
+                if embedding_set.status not in ("building", "failed"):
+                    raise SystemExit(f"Embedding set {embedding_set.id} is {embedding_set.status}, nothing to resume")
+                model = create_embedding_model(embedding_set.model)
+            else:
+                model = create_embedding_model(args.model)
+                embedding_set = create_set(db, model)
+            embed_missing(db, embedding_set, model, args.batch_size)
+            build_index(embedding_set)
+            if validate(db, embedding_set, model, args.sample_size, args.k) and args.activate:
+                activate(db, get_set(db, embedding_set.id))
+        elif args.command == "validate":
+            embedding_set = get_set(db, args.set_id)
+            validate(db, embedding_set, create_embedding_model(embedding_set.model), args.sample_size, args.k)
+        elif args.command == "activate":
+            activate(db, get_set(db, args.set_id))
+        elif args.command == "drop":
+            drop(db, get_set(db, args.set_id))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import unittest
+from agentic.utils.conversation_cache import CandidateSet, ConversationCache, FollowUp, parse_follow_up
+
+
+def products(first: int, count: int):
+    return [
+        {"id": i, "name": f"Product {i}", "brand": "Acme", "description": "x" * 100, "price": float(i)}
+        for i in range(first, first + count)
+    ]
+
+
+class ConversationCacheSizeTest(unittest.TestCase):
+    def test_restoring_a_grown_set_counts_its_new_size(self):
+        cache = ConversationCache(max_entries=10, ttl_seconds=60, max_bytes=1024 * 1024)
+        candidates = CandidateSet("shoes", "semantic", {}, products(0, 5), shown=5)
+        cache.put("a", candidates)
+        self.assertEqual(cache.size_bytes, candidates.size_bytes)
+
+        candidates.extend(products(5, 20))
+        cache.put("a", candidates)
+        self.assertEqual(cache.size_bytes, candidates.size_bytes)
+
+        cache.put("a", CandidateSet("boots", "semantic", {}, products(100, 3), shown=3))
+        cache.discard("a")
+        self.assertEqual(cache.size_bytes, 0)
+
+    def test_a_set_that_outgrows_the_budget_is_dropped(self):
+        candidates = CandidateSet("shoes", "semantic", {}, products(0, 5), shown=5)
+        cache = ConversationCache(max_entries=10, ttl_seconds=60, max_bytes=candidates.size_bytes * 2)
+        cache.put("a", candidates)
+
+        candidates.extend(products(5, 20))
+        cache.put("a", candidates)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.size_bytes, 0)
+
+    def test_more_pages_never_repeat(self):
+        candidates = CandidateSet("shoes", "semantic", {}, products(0, 12), shown=4)
+        pages = [candidates.next_page(FollowUp(more=True), 4) for _ in range(3)]
+        ids = [product["id"] for page in pages for product in page]
+        self.assertEqual(ids, list(range(4, 12)))
+
+
+class ParseFollowUpTest(unittest.TestCase):
+    def test_follow_ups_and_new_questions(self):
+        self.assertTrue(parse_follow_up("Show me more").more)
+        self.assertEqual(parse_follow_up("no Acer please", ["Acme", "Acer"]).exclude, ["Acer"])
+        self.assertIsNone(parse_follow_up("no Acer"))
+        self.assertIsNone(parse_follow_up("more running shoes for trail races"))
+
+
+if __name__ == "__main__":
+    unittest.main()
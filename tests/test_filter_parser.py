@@ -0,0 +1,25 @@
+import unittest
+from agentic.utils.filter_parser import FilterParser
+
+
+class FilterParserPriceTest(unittest.TestCase):
+    def setUp(self):
+        self.parser = FilterParser(["Nike"], ["Running Shoes", "Laptops"])
+
+    def test_marked_amounts_are_prices(self):
+        self.assertEqual(self.parser.parse("nike shoes under $100"), {"max_price": 100.0, "brand": "Nike"})
+        self.assertEqual(self.parser.parse("laptops under 2k")["max_price"], 2000.0)
+        self.assertEqual(self.parser.parse("max 30 bucks"), {"max_price": 30.0})
+        self.assertEqual(self.parser.parse("shoes from $50"), {"min_price": 50.0})
+        self.assertEqual(self.parser.parse("between 50 and 100 dollars"), {"min_price": 50.0, "max_price": 100.0})
+        self.assertEqual(self.parser.parse("$50-100")["max_price"], 100.0)
+
+    def test_bare_numbers_are_not_prices(self):
+        self.assertEqual(self.parser.parse("things from 2020"), {})
+        self.assertEqual(self.parser.parse("running shoes over 2 years old"), {"category": "Running Shoes"})
+        self.assertEqual(self.parser.parse("models 2019-2021"), {})
+        self.assertNotIn("min_price", self.parser.parse("iphone 15 to $900"))
+
+
+if __name__ == "__main__":
+    unittest.main()